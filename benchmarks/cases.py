@@ -0,0 +1,158 @@
+import os
+import shutil
+import time
+import zipfile
+
+# Repo modules are imported inside the cases: config creates data/ relative
+# to the working directory at import time, and every case runs in its own
+# scratch directory.
+
+MB = 1024 * 1024
+REGISTER_CALLS = 2000
+SEED_BATCH = 50000
+
+class FakeUser:
+    def __init__(self, user_id):
+        self.id = user_id
+        self.first_name = f"User {user_id}"
+        self.last_name = ""
+        self.username = f"user{user_id}" if user_id % 3 else None
+
+def lift_limits(corpus):
+    # The bot's own limits would reject most of the corpus; raise them so the
+    # benchmark measures the full extraction path rather than an early refusal.
+    import utils.zip_handler as zip_handler
+    zip_handler.MAX_FILES = corpus["entries"] * 2
+    zip_handler.MAX_TOTAL_SIZE = corpus["bytes"] * 2
+    zip_handler.MAX_SINGLE_FILE_SIZE = corpus["bytes"] * 2
+    zip_handler.MAX_COMPRESSION_RATIO = 10 ** 6
+    return zip_handler
+
+def use_mmap(enabled):
+    import utils.archive_backends as archive_backends
+    archive_backends.MMAP_ARCHIVES = enabled
+
+def best_of(repeat, func, before=None):
+    best = None
+    for _ in range(repeat):
+        if before:
+            before()
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+def bench_check_zip_safety(corpus, repeat):
+    zip_handler = lift_limits(corpus)
+
+    def run():
+        ok, error = zip_handler.check_zip_safety(corpus["path"])
+        if not ok:
+            raise RuntimeError(error)
+
+    return {"seconds": best_of(repeat, run), "bytes": corpus["bytes"], "entries": corpus["entries"]}
+
+def bench_extract_zip(corpus, repeat):
+    zip_handler = lift_limits(corpus)
+    result = {}
+
+    def cleanup():
+        if result.get("extract_dir"):
+            shutil.rmtree(result["extract_dir"], ignore_errors=True)
+
+    def run():
+        result.clear()
+        result.update(zip_handler.extract_zip(corpus["path"], 0))
+        if not result["success"]:
+            raise RuntimeError(result["error"])
+
+    seconds = best_of(repeat, run, before=cleanup)
+    cleanup()
+    return {"seconds": seconds, "bytes": corpus["bytes"], "entries": corpus["entries"]}
+
+# mmap against buffered reads, whatever MMAP_ARCHIVES is set to. Parallel
+# extraction is off in both so the archive is only read in this process.
+
+def bench_check_zip_safety_mapped(corpus, repeat):
+    use_mmap(True)
+    return bench_check_zip_safety(corpus, repeat)
+
+def bench_check_zip_safety_buffered(corpus, repeat):
+    use_mmap(False)
+    return bench_check_zip_safety(corpus, repeat)
+
+def bench_extract_zip_mapped(corpus, repeat):
+    use_mmap(True)
+    lift_limits(corpus).PARALLEL_EXTRACT_WORKERS = 1
+    return bench_extract_zip(corpus, repeat)
+
+def bench_extract_zip_buffered(corpus, repeat):
+    use_mmap(False)
+    lift_limits(corpus).PARALLEL_EXTRACT_WORKERS = 1
+    return bench_extract_zip(corpus, repeat)
+
+def bench_iter_backup(corpus, repeat):
+    # A full /get backup of the extracted corpus, parts written and deleted
+    # as they are handed out.
+    import utils.backup as backup
+    source_dir = os.path.abspath("backup_source")
+    output_prefix = os.path.abspath("backup.zip")
+    with zipfile.ZipFile(corpus["path"]) as zip_ref:
+        zip_ref.extractall(source_dir)
+    backup.get_backup_items = lambda: [(source_dir, "data")]
+
+    def run():
+        for item in backup.iter_backup(output_prefix, full=True):
+            if "part" in item:
+                os.remove(item["part"])
+
+    return {"seconds": best_of(repeat, run), "bytes": corpus["bytes"], "entries": corpus["entries"]}
+
+def seed_users(user_manager, count):
+    registered_at = "2020-01-01 00:00:00"
+    for start in range(1, count + 1, SEED_BATCH):
+        user_manager.save_users({
+            str(user_id): {"first_name": f"User {user_id}", "registered_at": registered_at}
+            for user_id in range(start, min(start + SEED_BATCH, count + 1))
+        })
+
+def bench_register_user(user_count, repeat):
+    import utils.user_manager as user_manager
+    seed_users(user_manager, user_count)
+    next_id = [user_count + 1]
+
+    # Half the calls register new users, half hit users that already exist,
+    # matching the /start and archive-upload paths.
+    def run():
+        for i in range(REGISTER_CALLS // 2):
+            user_manager.register_user(FakeUser(next_id[0]))
+            next_id[0] += 1
+            user_manager.register_user(FakeUser(1 + (i * 7919) % user_count))
+
+    return {"seconds": best_of(repeat, run), "ops": REGISTER_CALLS}
+
+def bench_load_settings(calls, repeat):
+    import utils.settings_manager as settings_manager
+    settings_manager.add_channel("benchmark_channel", "Benchmark Channel")
+    settings_manager.flush_settings()
+
+    def run():
+        for _ in range(calls):
+            settings_manager.load_settings()
+
+    return {"seconds": best_of(repeat, run), "ops": calls}
+
+def bench_load_settings_changed(calls, repeat):
+    # Every call sees a new mtime, so each one re-reads settings.json.
+    import utils.settings_manager as settings_manager
+    settings_manager.add_channel("benchmark_channel", "Benchmark Channel")
+    settings_manager.flush_settings()
+    mtime = os.stat(settings_manager.SETTINGS_FILE).st_mtime_ns
+
+    def run():
+        for i in range(calls):
+            os.utime(settings_manager.SETTINGS_FILE, ns=(mtime + i + 1, mtime + i + 1))
+            settings_manager.load_settings()
+
+    return {"seconds": best_of(repeat, run), "ops": calls}
@@ -0,0 +1,139 @@
+import json
+import os
+import random
+import zipfile
+
+# Bump when the generator changes so cached corpora are rebuilt.
+CORPUS_VERSION = 1
+SEED = 1337
+FIXED_DATE = (2020, 1, 1, 0, 0, 0)
+MB = 1024 * 1024
+
+WORDS = (
+    "archive extract telegram channel user file photo video document backup "
+    "settings broadcast admin limit size bytes stream chunk member deflate"
+).split()
+
+# name -> (description, full-scale params, quick-scale params)
+CORPORA = {
+    "tiny_files": ("many tiny text files", {"count": 20000}, {"count": 2000}),
+    "huge_files": ("few huge mixed files", {"count": 3, "size_mb": 40}, {"count": 2, "size_mb": 8}),
+    "compressible": ("highly compressible logs", {"count": 20, "size_mb": 5}, {"count": 5, "size_mb": 2}),
+    "media": ("already-compressed media, stored", {"count": 40, "size_mb": 2}, {"count": 10, "size_mb": 1}),
+    "stored_media": ("many photo-sized media files, stored", {"count": 2000, "size_kb": 48}, {"count": 400, "size_kb": 48}),
+    "deep_paths": ("files under deep directory trees", {"count": 5000, "depth": 24}, {"count": 500, "depth": 24}),
+    "collisions": ("same file name in every directory", {"count": 10000}, {"count": 1000}),
+}
+
+def random_bytes(rng, size):
+    return rng.getrandbits(size * 8).to_bytes(size, "little") if size else b""
+
+def text_block(rng, size):
+    parts = []
+    length = 0
+    while length < size:
+        line = " ".join(rng.choice(WORDS) for _ in range(rng.randint(4, 12))) + "\n"
+        parts.append(line)
+        length += len(line)
+    return "".join(parts).encode()[:size]
+
+def write_entry(zipf, name, data, compress_type=zipfile.ZIP_DEFLATED):
+    info = zipfile.ZipInfo(name, date_time=FIXED_DATE)
+    info.compress_type = compress_type
+    zipf.writestr(info, data)
+    return len(data)
+
+def build_tiny_files(zipf, rng, count):
+    total = 0
+    for i in range(count):
+        total += write_entry(zipf, f"notes/{i // 500}/note_{i}.txt", text_block(rng, rng.randint(16, 512)))
+    return count, total
+
+def build_huge_files(zipf, rng, count, size_mb):
+    # Half random, half text per megabyte: realistic ~2x compression.
+    blocks = [text_block(rng, MB // 2) for _ in range(8)]
+    total = 0
+    for i in range(count):
+        data = b"".join(
+            random_bytes(rng, MB // 2) + rng.choice(blocks) for _ in range(size_mb)
+        )
+        total += write_entry(zipf, f"dump_{i}.bin", data)
+    return count, total
+
+def build_compressible(zipf, rng, count, size_mb):
+    # A block smaller than the 32KB deflate window compresses several hundred times.
+    block = text_block(rng, 16 * 1024)
+    total = 0
+    for i in range(count):
+        data = block * (size_mb * 64)
+        total += write_entry(zipf, f"logs/server_{i}.log", data)
+    return count, total
+
+def build_media(zipf, rng, count, size_mb):
+    extensions = [".jpg", ".png", ".mp4", ".mkv"]
+    total = 0
+    for i in range(count):
+        name = f"media/clip_{i}{extensions[i % len(extensions)]}"
+        total += write_entry(zipf, name, random_bytes(rng, size_mb * MB), zipfile.ZIP_STORED)
+    return count, total
+
+def build_stored_media(zipf, rng, count, size_kb):
+    extensions = [".jpg", ".png", ".webp", ".mp4"]
+    total = 0
+    for i in range(count):
+        name = f"camera/{i // 100}/img_{i}{extensions[i % len(extensions)]}"
+        size = rng.randint(size_kb // 2, size_kb * 3 // 2) * 1024
+        total += write_entry(zipf, name, random_bytes(rng, size), zipfile.ZIP_STORED)
+    return count, total
+
+def build_deep_paths(zipf, rng, count, depth):
+    total = 0
+    for i in range(count):
+        levels = "/".join(f"level_{rng.randint(0, 3)}" for _ in range(depth))
+        total += write_entry(zipf, f"{levels}/file_{i}.txt", text_block(rng, rng.randint(64, 2048)))
+    return count, total
+
+def build_collisions(zipf, rng, count):
+    total = 0
+    for i in range(count):
+        total += write_entry(zipf, f"album_{i}/image.jpg", random_bytes(rng, rng.randint(256, 4096)))
+    return count, total
+
+BUILDERS = {
+    "tiny_files": build_tiny_files,
+    "huge_files": build_huge_files,
+    "compressible": build_compressible,
+    "media": build_media,
+    "stored_media": build_stored_media,
+    "deep_paths": build_deep_paths,
+    "collisions": build_collisions,
+}
+
+def build_corpus(out_dir, quick=False, names=None):
+    # Returns {name: {"path", "entries", "bytes", "description"}}. Archives are
+    # byte-for-byte reproducible and reused while the manifest matches.
+    scale = "quick" if quick else "full"
+    corpus_dir = os.path.join(out_dir, f"v{CORPUS_VERSION}_{scale}")
+    os.makedirs(corpus_dir, exist_ok=True)
+    manifest_path = os.path.join(corpus_dir, "manifest.json")
+
+    manifest = {}
+    if os.path.exists(manifest_path):
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+
+    for name in names or CORPORA:
+        description, full_params, quick_params = CORPORA[name]
+        path = os.path.join(corpus_dir, f"{name}.zip")
+        if name in manifest and os.path.exists(path):
+            continue
+
+        rng = random.Random(f"{SEED}:{name}")
+        with zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED) as zipf:
+            entries, total = BUILDERS[name](zipf, rng, **(quick_params if quick else full_params))
+        manifest[name] = {"path": path, "entries": entries, "bytes": total, "description": description}
+
+        with open(manifest_path, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=2)
+
+    return {name: manifest[name] for name in names or CORPORA}
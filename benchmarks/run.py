@@ -0,0 +1,183 @@
+import argparse
+import fnmatch
+import json
+import multiprocessing
+import os
+import platform
+import shutil
+import sys
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+from benchmarks import cases
+from benchmarks.corpus import CORPORA, build_corpus
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_BASELINE = os.path.join(PROJECT_ROOT, "benchmarks", "baseline.json")
+DEFAULT_CORPUS_DIR = os.path.join(tempfile.gettempdir(), "unzip_bot_corpus")
+MB = 1024 * 1024
+
+USER_COUNTS = {"1k": 1000, "100k": 100000, "1M": 1000000}
+QUICK_USER_COUNTS = {"1k": 1000, "100k": 100000}
+SETTINGS_CALLS = 20000
+SETTINGS_CHANGED_CALLS = 2000
+
+ARCHIVE_CASES = ("bench_check_zip_safety", "bench_extract_zip", "bench_iter_backup")
+# Memory-mapped against buffered ZIP reading, on stored media and on a large
+# central directory.
+MMAP_CASES = (
+    "bench_check_zip_safety_mapped", "bench_check_zip_safety_buffered",
+    "bench_extract_zip_mapped", "bench_extract_zip_buffered",
+)
+MMAP_CORPORA = ("media", "stored_media", "tiny_files")
+
+def build_cases(corpus, quick):
+    # name -> (case function name, argument)
+    planned = {}
+    for func_name in ARCHIVE_CASES:
+        for corpus_name, entry in corpus.items():
+            planned[f"{func_name[len('bench_'):]}[{corpus_name}]"] = (func_name, entry)
+    for func_name in MMAP_CASES:
+        for corpus_name in MMAP_CORPORA:
+            planned[f"{func_name[len('bench_'):]}[{corpus_name}]"] = (func_name, corpus[corpus_name])
+    for label, count in (QUICK_USER_COUNTS if quick else USER_COUNTS).items():
+        planned[f"register_user[{label}]"] = ("bench_register_user", count)
+    planned["load_settings[cached]"] = ("bench_load_settings", SETTINGS_CALLS)
+    planned["load_settings[changed]"] = ("bench_load_settings_changed", SETTINGS_CHANGED_CALLS)
+    return planned
+
+def peak_rss_mb():
+    # Linux keeps ru_maxrss across exec, so a spawned child would report the
+    # parent's peak; VmHWM starts fresh with the new address space.
+    try:
+        with open("/proc/self/status", 'r', encoding='utf-8') as f:
+            own = next(int(line.split()[1]) for line in f if line.startswith("VmHWM:"))
+    except (OSError, StopIteration):
+        own = None
+
+    if resource is None:
+        return own / 1024 if own is not None else None
+
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    if own is None:
+        own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and kilobytes elsewhere.
+    peak = max(own, children)
+    return peak / MB if sys.platform == "darwin" else peak / 1024
+
+def run_case(func_name, arg, repeat, workdir):
+    # Runs in a fresh process so peak RSS belongs to this case alone, and in
+    # a scratch directory so data/ never touches the real bot's files.
+    os.chdir(workdir)
+    sys.path.insert(0, PROJECT_ROOT)
+    result = getattr(cases, func_name)(arg, repeat)
+    result["rss_mb"] = peak_rss_mb()
+    return result
+
+def run_isolated(func_name, arg, repeat):
+    workdir = tempfile.mkdtemp(prefix="unzip_bot_bench_")
+    try:
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+            return executor.submit(run_case, func_name, arg, repeat, workdir).result()
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+def throughput(result):
+    seconds = result["seconds"] or 1e-9
+    if "ops" in result:
+        return f"{result['ops'] / seconds:,.0f} ops/s", ""
+    return f"{result['bytes'] / MB / seconds:,.1f} MB/s", f"{result['entries'] / seconds:,.0f} entries/s"
+
+def compare(result, baseline, threshold):
+    if not baseline:
+        return "", False
+    change = (result["seconds"] - baseline["seconds"]) / baseline["seconds"] * 100
+    if change > threshold:
+        return f"{change:+.1f}% slower", True
+    if change < -threshold:
+        return f"{change:+.1f}% faster", False
+    return f"{change:+.1f}%", False
+
+def load_baseline(path):
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def save_baseline(path, results, quick):
+    data = {
+        "quick": quick,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "results": results
+    }
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=2, sort_keys=True)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the archive, user store and settings hot paths.")
+    parser.add_argument("--quick", action="store_true", help="smaller corpus and user counts")
+    parser.add_argument("--only", nargs="*", default=[], help="glob patterns of case names to run")
+    parser.add_argument("--repeat", type=int, default=3, help="repetitions per case; the best is kept")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="baseline JSON to compare against")
+    parser.add_argument("--save-baseline", action="store_true", help="store these results as the new baseline")
+    parser.add_argument("--threshold", type=float, default=10.0, help="percent change reported as a regression")
+    parser.add_argument("--corpus-dir", default=DEFAULT_CORPUS_DIR, help="where generated archives are cached")
+    parser.add_argument("--list", action="store_true", help="list case names and exit")
+    args = parser.parse_args(argv)
+
+    # Plan with placeholder corpora first so only the archives that the
+    # selected cases need get generated.
+    planned = build_cases({name: name for name in CORPORA}, args.quick)
+    # Brackets in case names are literal, not glob character classes.
+    patterns = [pattern.replace("[", "[[]") for pattern in args.only]
+    selected = [
+        name for name in planned
+        if not patterns or any(fnmatch.fnmatch(name, pattern) for pattern in patterns)
+    ]
+    if args.list:
+        print("\n".join(selected))
+        return 0
+
+    needed = sorted({planned[name][1] for name in selected if planned[name][0] in ARCHIVE_CASES + MMAP_CASES})
+    corpus = build_corpus(args.corpus_dir, quick=args.quick, names=needed) if needed else {}
+    planned = build_cases({name: corpus.get(name) for name in CORPORA}, args.quick)
+
+    baseline = load_baseline(args.baseline)
+    if baseline and baseline.get("quick") != args.quick:
+        print(f"⚠️ Baseline was recorded with quick={baseline.get('quick')}, not comparing")
+        baseline = None
+    baseline_results = baseline["results"] if baseline else {}
+
+    results = {}
+    regressions = []
+    print(f"{'case':<42} {'seconds':>9} {'throughput':>16} {'entries':>18} {'peak RSS':>10}  baseline")
+    for name in selected:
+        func_name, arg = planned[name]
+        result = run_isolated(func_name, arg, args.repeat)
+        results[name] = result
+
+        rate, entries = throughput(result)
+        rss = f"{result['rss_mb']:.0f} MB" if result["rss_mb"] is not None else "n/a"
+        change, regressed = compare(result, baseline_results.get(name), args.threshold)
+        if regressed:
+            regressions.append(name)
+        print(f"{name:<42} {result['seconds']:>9.4f} {rate:>16} {entries:>18} {rss:>10}  {change}", flush=True)
+
+    if args.save_baseline:
+        save_baseline(args.baseline, results, args.quick)
+        print(f"\n💾 Baseline saved to {args.baseline}")
+
+    if regressions:
+        print(f"\n❌ {len(regressions)} case(s) slower than baseline by more than {args.threshold:g}%: {', '.join(regressions)}")
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
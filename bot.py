@@ -1,7 +1,6 @@
 import asyncio
 import logging
 import threading
-from http.server import HTTPServer, BaseHTTPRequestHandler
 
 from telegram.ext import (
     Application,
@@ -11,7 +10,10 @@ from telegram.ext import (
     filters,
 )
 
-from config import BOT_TOKEN
+from config import (
+    BOT_TOKEN, ADMIN_ID, MAX_CONCURRENT_UPDATES, HTTP_PORT,
+    WEBHOOK_URL, WEBHOOK_PATH, WEBHOOK_SECRET, DROP_PENDING_UPDATES
+)
 from handlers.commands import (
     start_command,
     help_command,
@@ -20,7 +22,19 @@ from handlers.commands import (
 )
 from handlers.messages import handle_text_message, handle_zip_file
 from handlers.callbacks import handle_callback
-from handlers.admin_dashboard import admin_command, handle_admin_callback
+from handlers.admin_dashboard import (
+    admin_command,
+    handle_admin_callback,
+    handle_admin_broadcast_media,
+)
+from utils.broadcaster import resume_broadcast
+from utils.update_processor import ChatOrderedUpdateProcessor
+from utils.storage_manager import register_existing_jobs, run_storage_janitor, get_storage_stats, get_memory_used
+from utils.job_scheduler import job_scheduler
+from utils import worker_pool
+from utils.metrics import Gauge, MetricsRequest, set_ready
+from utils.api_scheduler import ApiScheduler
+from utils.http_server import start_http_server, setup_webhook, get_webhook_secret
 
 # ================== LOGGING ==================
 logging.basicConfig(
@@ -29,20 +43,12 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-# ================== KOYEB DUMMY HTTP SERVER ==================
-class HealthHandler(BaseHTTPRequestHandler):
-    def do_GET(self):
-        self.send_response(200)
-        self.send_header("Content-type", "text/plain")
-        self.end_headers()
-        self.wfile.write(b"OK")
-
-def start_health_server():
-    server = HTTPServer(("0.0.0.0", 8000), HealthHandler)
-    server.serve_forever()
-
-# Start HTTP server in background thread
-threading.Thread(target=start_health_server, daemon=True).start()
+# ================== METRICS ==================
+Gauge("unzipbot_job_queue_depth", "Archive jobs waiting for a slot", job_scheduler.queue_depth)
+Gauge("unzipbot_jobs_running", "Archive jobs currently running", job_scheduler.running_jobs)
+Gauge("unzipbot_extract_queue_depth", "Extractions waiting for a worker thread", worker_pool.queue_depth)
+Gauge("unzipbot_extracted_bytes", "Bytes kept under data/extracted", lambda: get_storage_stats()["used_bytes"])
+Gauge("unzipbot_memory_bytes", "Archive and entry bytes held in memory by jobs", get_memory_used)
 
 # ================== MAIN BOT ==================
 async def main():
@@ -53,7 +59,20 @@ async def main():
         print("=" * 50)
         return
 
-    application = Application.builder().token(BOT_TOKEN).build()
+    register_existing_jobs()
+
+    api_scheduler = ApiScheduler()
+    Gauge("unzipbot_api_queue_depth", "Bot API requests waiting for a rate limit slot", api_scheduler.queue_depth)
+
+    application = (
+        Application.builder()
+        .token(BOT_TOKEN)
+        .request(MetricsRequest(connection_pool_size=256))
+        .get_updates_request(MetricsRequest())
+        .rate_limiter(api_scheduler)
+        .concurrent_updates(ChatOrderedUpdateProcessor(MAX_CONCURRENT_UPDATES))
+        .build()
+    )
 
     # -------- Commands --------
     application.add_handler(CommandHandler("start", start_command))
@@ -62,11 +81,32 @@ async def main():
     application.add_handler(CommandHandler("get", get_command))
     application.add_handler(CommandHandler("admin", admin_command))
 
-    # -------- ZIP file handler --------
+    # -------- Admin broadcast (media is copied to every user) --------
+    application.add_handler(
+        MessageHandler(
+            filters.User(user_id=ADMIN_ID) & ~filters.TEXT & ~filters.COMMAND,
+            handle_admin_broadcast_media,
+        ),
+        group=-1,
+    )
+
+    # -------- Archive file handler --------
     application.add_handler(
         MessageHandler(
             filters.Document.MimeType("application/zip")
-            | filters.Document.FileExtension("zip"),
+            | filters.Document.MimeType("application/x-tar")
+            | filters.Document.MimeType("application/gzip")
+            | filters.Document.MimeType("application/x-gzip")
+            | filters.Document.MimeType("application/x-bzip2")
+            | filters.Document.MimeType("application/x-xz")
+            | filters.Document.FileExtension("zip")
+            | filters.Document.FileExtension("tar")
+            | filters.Document.FileExtension("gz")
+            | filters.Document.FileExtension("tgz")
+            | filters.Document.FileExtension("bz2")
+            | filters.Document.FileExtension("tbz2")
+            | filters.Document.FileExtension("xz")
+            | filters.Document.FileExtension("txz"),
             handle_zip_file,
         )
     )
@@ -87,16 +127,35 @@ async def main():
 
     print("=" * 50)
     print("🤖 Bot is starting...")
-    print("📡 Using long polling mode (no webhook)")
-    print("🌐 Dummy HTTP server running on port 8000 (Koyeb fix)")
+    if WEBHOOK_URL:
+        print(f"📡 Using webhook mode ({WEBHOOK_URL.rstrip('/')}{WEBHOOK_PATH})")
+    else:
+        print("📡 Using long polling mode (no webhook)")
+    print(f"🌐 HTTP server running on port {HTTP_PORT} (/, /ready, /metrics)")
     print("=" * 50)
 
     async with application:
         await application.start()
-        await application.updater.start_polling(drop_pending_updates=True)
+        if WEBHOOK_URL:
+            await setup_webhook(
+                application,
+                WEBHOOK_URL,
+                WEBHOOK_PATH,
+                get_webhook_secret(WEBHOOK_SECRET, BOT_TOKEN),
+                DROP_PENDING_UPDATES,
+            )
+        else:
+            await application.updater.start_polling(drop_pending_updates=DROP_PENDING_UPDATES)
+        set_ready(True)
+        await resume_broadcast(application)
+        application.create_task(run_storage_janitor())
 
         # Keep bot alive forever
         await asyncio.Event().wait()
 
 if __name__ == "__main__":
+    # ================== KOYEB HEALTH / WEBHOOK HTTP SERVER ==================
+    # Started here rather than at import: extraction worker processes
+    # re-import this module and must not bind the port again.
+    threading.Thread(target=start_http_server, args=(HTTP_PORT,), daemon=True).start()
     asyncio.run(main())
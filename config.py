@@ -8,8 +8,11 @@ ADMIN_ID = int(os.getenv("ADMIN_ID", "0"))
 CHANNEL_USERNAME = os.getenv("CHANNEL_USERNAME", "BALAKXWEBS")
 CHANNEL_LINK = f"https://t.me/{CHANNEL_USERNAME}"
 
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 DATA_DIR = "data"
 USERS_FILE = os.path.join(DATA_DIR, "users.json")
+USERS_DB = os.path.join(DATA_DIR, "users.db")
+RESULT_CACHE_DB = os.path.join(DATA_DIR, "result_cache.db")
 EXTRACTED_DIR = os.path.join(DATA_DIR, "extracted")
 LOGS_DIR = os.path.join(DATA_DIR, "logs")
 
@@ -19,3 +22,48 @@ IMAGE_EXTENSIONS = ['.jpg', '.jpeg', '.png', '.gif', '.bmp', '.webp', '.tiff', '
 os.makedirs(DATA_DIR, exist_ok=True)
 os.makedirs(EXTRACTED_DIR, exist_ok=True)
 os.makedirs(LOGS_DIR, exist_ok=True)
+
+EXTRACT_WORKERS = int(os.getenv("EXTRACT_WORKERS", "2"))
+EXTRACT_QUEUE_SIZE = int(os.getenv("EXTRACT_QUEUE_SIZE", "8"))
+# Entries extracted ahead of the sender. Entries already handed to the
+# sender may also wait in a pending album, up to ALBUM_SIZE - 1 (and
+# ALBUM_MAX_BYTES) for each of its 3 album groups, so a job keeps at most
+# STREAM_BUFFER_ENTRIES + 27 unsent files on disk.
+STREAM_BUFFER_ENTRIES = int(os.getenv("STREAM_BUFFER_ENTRIES", "4"))
+SETTINGS_FLUSH_DELAY = float(os.getenv("SETTINGS_FLUSH_DELAY", "0.5"))
+MEMBERSHIP_CACHE_TTL = int(os.getenv("MEMBERSHIP_CACHE_TTL", "300"))
+MEMBERSHIP_NEGATIVE_TTL = int(os.getenv("MEMBERSHIP_NEGATIVE_TTL", "30"))
+BROADCAST_RATE = float(os.getenv("BROADCAST_RATE", "25"))
+BROADCAST_CONCURRENCY = int(os.getenv("BROADCAST_CONCURRENCY", "10"))
+BROADCAST_PROGRESS_INTERVAL = int(os.getenv("BROADCAST_PROGRESS_INTERVAL", "10"))
+RESULT_CACHE_MAX_ARCHIVES = int(os.getenv("RESULT_CACHE_MAX_ARCHIVES", "5000"))
+RESULT_CACHE_MAX_AGE_DAYS = int(os.getenv("RESULT_CACHE_MAX_AGE_DAYS", "30"))
+ALBUM_MAX_BYTES = int(os.getenv("ALBUM_MAX_BYTES", str(50 * 1024 * 1024)))
+MAX_CONCURRENT_UPDATES = int(os.getenv("MAX_CONCURRENT_UPDATES", "64"))
+JOB_SLOTS = int(os.getenv("JOB_SLOTS", "4"))
+USER_MAX_CONCURRENT_JOBS = int(os.getenv("USER_MAX_CONCURRENT_JOBS", "1"))
+USER_HOURLY_QUOTA_MB = int(os.getenv("USER_HOURLY_QUOTA_MB", "500"))
+EXTRACTED_QUOTA_MB = int(os.getenv("EXTRACTED_QUOTA_MB", "2048"))
+DISK_MIN_FREE_MB = int(os.getenv("DISK_MIN_FREE_MB", "500"))
+EXTRACTED_TTL_MINUTES = int(os.getenv("EXTRACTED_TTL_MINUTES", "60"))
+PARALLEL_EXTRACT_WORKERS = int(os.getenv("PARALLEL_EXTRACT_WORKERS", str(min(4, os.cpu_count() or 1))))
+PARALLEL_EXTRACT_MIN_MB = int(os.getenv("PARALLEL_EXTRACT_MIN_MB", "32"))
+NESTED_EXTRACT_DEPTH = int(os.getenv("NESTED_EXTRACT_DEPTH", "0"))
+NESTED_IN_MEMORY_MAX_MB = int(os.getenv("NESTED_IN_MEMORY_MAX_MB", "8"))
+HTTP_PORT = int(os.getenv("PORT", "8000"))
+WEBHOOK_URL = os.getenv("WEBHOOK_URL", "")
+WEBHOOK_PATH = os.getenv("WEBHOOK_PATH", "/telegram")
+WEBHOOK_SECRET = os.getenv("WEBHOOK_SECRET", "")
+DROP_PENDING_UPDATES = os.getenv("DROP_PENDING_UPDATES", "false").lower() == "true"
+BACKUP_PART_MB = int(os.getenv("BACKUP_PART_MB", "45"))
+SPLIT_LARGE_FILES = os.getenv("SPLIT_LARGE_FILES", "false").lower() == "true"
+SPLIT_PART_MB = min(int(os.getenv("SPLIT_PART_MB", "45")), 50)
+MEMORY_JOB_MAX_MB = int(os.getenv("MEMORY_JOB_MAX_MB", "8"))
+MEMORY_GLOBAL_MAX_MB = int(os.getenv("MEMORY_GLOBAL_MAX_MB", "64"))
+MMAP_ARCHIVES = os.getenv("MMAP_ARCHIVES", "false").lower() == "true"
+API_GLOBAL_RATE = float(os.getenv("API_GLOBAL_RATE", "30"))
+API_CHAT_RATE = float(os.getenv("API_CHAT_RATE", "1"))
+API_CHAT_BURST = int(os.getenv("API_CHAT_BURST", "5"))
+API_GROUP_RATE_PER_MINUTE = float(os.getenv("API_GROUP_RATE_PER_MINUTE", "20"))
+API_MAX_RETRIES = int(os.getenv("API_MAX_RETRIES", "3"))
+PROGRESS_INTERVAL = float(os.getenv("PROGRESS_INTERVAL", "5"))
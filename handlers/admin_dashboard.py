@@ -1,11 +1,19 @@
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
-from telegram.ext import ContextTypes
+from telegram.ext import ContextTypes, ApplicationHandlerStop
 from config import ADMIN_ID
 from utils.settings_manager import (
     get_channels, add_channel, remove_channel, toggle_channel,
     get_setting, set_setting, toggle_maintenance, is_maintenance_mode
 )
-from utils.user_manager import get_total_users, load_users
+from utils.channel_check import invalidate_membership_cache
+from utils.job_scheduler import job_scheduler
+from utils.storage_manager import get_storage_stats
+from utils.broadcaster import (
+    new_broadcast_job, start_broadcast, stop_broadcast, is_broadcast_running
+)
+from utils.user_manager import get_total_users, get_username_count, get_recent_users
+
+MB = 1024 * 1024
 
 def get_admin_main_keyboard():
     keyboard = [
@@ -136,17 +144,26 @@ async def handle_admin_callback(update: Update, context: ContextTypes.DEFAULT_TY
         await query.edit_message_text(text, parse_mode="HTML", reply_markup=get_settings_keyboard())
     
     elif data == "admin_stats":
-        users = load_users()
-        total = len(users)
-        with_username = len([u for u in users.values() if u.get("username")])
+        total = get_total_users()
+        with_username = get_username_count()
+        storage = get_storage_stats()
         
         text = (
             "📊 <b>Bot Statistics</b>\n\n"
             f"👥 Total Users: <b>{total}</b>\n"
             f"📛 With Username: <b>{with_username}</b>\n"
             f"👤 Without Username: <b>{total - with_username}</b>\n"
-            f"📢 Channels: <b>{len(get_channels())}</b>\n"
+            f"📢 Channels: <b>{len(get_channels())}</b>\n\n"
+            f"⚙️ Running ZIP jobs: <b>{job_scheduler.running_jobs()}</b>\n"
+            f"⏳ Queued ZIP jobs: <b>{job_scheduler.queue_depth()}</b>\n\n"
+            f"💾 Extracted files: <b>{storage['used_bytes'] / MB:.1f}/{storage['quota_bytes'] / MB:.0f} MB</b>\n"
+            f"📂 Active / retained jobs: <b>{storage['active_jobs']}/{storage['retained_jobs']}</b>\n"
+            f"🗄 Disk free: <b>{storage['disk_free_bytes'] / MB:.0f}/{storage['disk_total_bytes'] / MB:.0f} MB</b>\n"
         )
+        if storage["top_users"]:
+            text += f"\n👤 <b>Disk use by user ({storage['users']} users):</b>\n"
+            for user_id, used in storage["top_users"]:
+                text += f"• <code>{user_id}</code>: {used / MB:.1f} MB\n"
         await query.edit_message_text(text, parse_mode="HTML", reply_markup=get_back_keyboard())
     
     elif data == "admin_close":
@@ -155,6 +172,8 @@ async def handle_admin_callback(update: Update, context: ContextTypes.DEFAULT_TY
     elif data.startswith("ch_toggle_"):
         username = data.replace("ch_toggle_", "")
         success, message = toggle_channel(username)
+        if success:
+            invalidate_membership_cache()
         await query.answer(message, show_alert=True)
         
         channels = get_channels()
@@ -169,6 +188,8 @@ async def handle_admin_callback(update: Update, context: ContextTypes.DEFAULT_TY
     elif data.startswith("ch_remove_"):
         username = data.replace("ch_remove_", "")
         success, message = remove_channel(username)
+        if success:
+            invalidate_membership_cache()
         await query.answer(message, show_alert=True)
         
         channels = get_channels()
@@ -191,11 +212,10 @@ async def handle_admin_callback(update: Update, context: ContextTypes.DEFAULT_TY
         await query.edit_message_text(text, parse_mode="HTML", reply_markup=get_back_keyboard())
     
     elif data == "users_list":
-        users = load_users()
-        if not users:
+        user_list = get_recent_users(20)
+        if not user_list:
             text = "👥 <b>No users registered yet</b>"
         else:
-            user_list = list(users.values())[:20]
             text = "👥 <b>Recent Users</b> (showing last 20)\n\n"
             for i, u in enumerate(user_list, 1):
                 name = f"{u.get('first_name', '')} {u.get('last_name', '')}".strip() or "Unknown"
@@ -213,9 +233,14 @@ async def handle_admin_callback(update: Update, context: ContextTypes.DEFAULT_TY
         )
         await query.edit_message_text(text, parse_mode="HTML", reply_markup=get_back_keyboard())
     
+    elif data == "users_broadcast_stop":
+        if stop_broadcast():
+            await query.answer("Stopping broadcast...", show_alert=True)
+        else:
+            await query.answer("No broadcast is running", show_alert=True)
+    
     elif data == "users_stats":
-        users = load_users()
-        total = len(users)
+        total = get_total_users()
         text = f"📊 <b>User Statistics</b>\n\n👥 Total: <b>{total}</b>"
         await query.edit_message_text(text, parse_mode="HTML", reply_markup=get_back_keyboard())
     
@@ -259,6 +284,8 @@ async def handle_admin_text(update: Update, context: ContextTypes.DEFAULT_TYPE):
     if context.user_data.get("awaiting_channel"):
         context.user_data.pop("awaiting_channel", None)
         success, message = add_channel(text)
+        if success:
+            invalidate_membership_cache()
         await update.message.reply_text(
             f"{'✅' if success else '❌'} {message}",
             reply_markup=get_channel_management_keyboard()
@@ -267,28 +294,33 @@ async def handle_admin_text(update: Update, context: ContextTypes.DEFAULT_TYPE):
     
     if context.user_data.get("awaiting_broadcast"):
         context.user_data.pop("awaiting_broadcast", None)
-        users = load_users()
-        success_count = 0
-        fail_count = 0
-        
-        await update.message.reply_text("📢 Broadcasting message...")
-        
-        for user_id_str, user_data in users.items():
-            try:
-                await context.bot.send_message(
-                    chat_id=int(user_id_str),
-                    text=text
-                )
-                success_count += 1
-            except Exception:
-                fail_count += 1
-        
+        await start_admin_broadcast(update, context, text=text)
+        return True
+    
+    return False
+
+async def handle_admin_broadcast_media(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    if update.effective_user.id != ADMIN_ID or not context.user_data.get("awaiting_broadcast"):
+        return
+    
+    context.user_data.pop("awaiting_broadcast", None)
+    await start_admin_broadcast(update, context)
+    raise ApplicationHandlerStop
+
+async def start_admin_broadcast(update: Update, context: ContextTypes.DEFAULT_TYPE, text=None):
+    if is_broadcast_running():
         await update.message.reply_text(
-            f"✅ Broadcast complete!\n\n"
-            f"📤 Sent: {success_count}\n"
-            f"❌ Failed: {fail_count}",
+            "⚠️ A broadcast is already running. Stop it first.",
             reply_markup=get_admin_main_keyboard()
         )
-        return True
+        return
     
-    return False
+    progress_msg = await update.message.reply_text("📢 Broadcasting message...")
+    job = new_broadcast_job(
+        admin_chat_id=progress_msg.chat_id,
+        progress_message_id=progress_msg.message_id,
+        text=text,
+        from_chat_id=update.message.chat_id,
+        message_id=update.message.message_id
+    )
+    start_broadcast(context.application, job)
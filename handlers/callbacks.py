@@ -1,6 +1,6 @@
 from telegram import Update
 from telegram.ext import ContextTypes
-from utils.channel_check import is_user_member
+from utils.channel_check import is_user_member, invalidate_membership_cache
 from handlers.keyboards import get_main_keyboard, get_join_channel_keyboard
 from handlers.commands import WELCOME_MESSAGE
 
@@ -12,6 +12,7 @@ async def handle_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
     
     if data == "check_membership":
         user_id = update.effective_user.id
+        invalidate_membership_cache(user_id)
         is_member = await is_user_member(context.bot, user_id)
         
         if is_member:
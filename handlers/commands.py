@@ -1,11 +1,14 @@
 import os
+import tempfile
+from contextlib import aclosing
 from datetime import datetime
 from telegram import Update
 from telegram.ext import ContextTypes
 from config import ADMIN_ID, DATA_DIR, CHANNEL_LINK
 from utils.user_manager import register_user, get_total_users, get_user_info_text
 from utils.channel_check import is_user_member
-from utils.zip_handler import create_backup_zip
+from utils.backup import iter_backup, save_backup_manifest
+from utils.worker_pool import iterate_blocking
 from handlers.keyboards import get_main_keyboard, get_join_channel_keyboard
 
 WELCOME_MESSAGE = """
@@ -25,7 +28,7 @@ HELP_MESSAGE = """
 ℹ️ <b>Help & Instructions</b>
 
 <b>📦 Upload ZIP</b>
-Simply send any ZIP file and I'll extract its contents for you.
+Simply send any ZIP or TAR archive (also .gz, .bz2, .xz) and I'll extract its contents for you.
 
 <b>📜 Rules</b>
 View the bot usage rules.
@@ -44,7 +47,7 @@ RULES_MESSAGE = """
 📜 <b>Bot Usage Rules</b>
 
 1️⃣ You must join our channel to use this bot
-2️⃣ Only ZIP files are supported
+2️⃣ Only ZIP, TAR, GZ, BZ2 and XZ archives are supported
 3️⃣ Maximum file size: 20MB (Telegram limit)
 4️⃣ Do not upload malicious or illegal content
 5️⃣ Respect other users and the community
@@ -136,36 +139,61 @@ async def get_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         await update.message.reply_text("⛔ This command is for admins only.")
         return
     
-    await update.message.reply_text("📦 Creating full bot backup... Please wait.")
+    # "/get full" ignores the previous manifest and sends everything.
+    full = bool(context.args) and context.args[0].lower() == "full"
+    await update.message.reply_text(
+        f"📦 Creating {'full' if full else 'incremental'} bot backup... Please wait."
+    )
     
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    backup_path = f"/tmp/bot_backup_{timestamp}.zip"
-    
-    base_dir = "/home/runner/workspace"
-    
-    items_to_backup = [
-        os.path.join(base_dir, "bot.py"),
-        os.path.join(base_dir, "config.py"),
-        os.path.join(base_dir, "requirements.txt"),
-        os.path.join(base_dir, ".env.example"),
-        os.path.join(base_dir, "README.md"),
-        os.path.join(base_dir, "handlers"),
-        os.path.join(base_dir, "utils"),
-        os.path.join(base_dir, "data"),
-    ]
-    
-    success, result = create_backup_zip(items_to_backup, backup_path, base_dir)
+    backup_prefix = os.path.join(tempfile.gettempdir(), f"bot_backup_{timestamp}.zip")
+    
+    parts = []
+    summary = None
+    try:
+        backup = iterate_blocking(iter_backup, backup_prefix, full)
+        async with aclosing(backup):
+            async for item in backup:
+                if "part" not in item:
+                    summary = item
+                    continue
+                parts.append(item["part"])
+                with open(item["part"], 'rb') as backup_file:
+                    await update.message.reply_document(
+                        document=backup_file,
+                        filename=os.path.basename(item["part"]),
+                        caption=f"📁 Backup part {len(parts)}"
+                    )
+                os.remove(item["part"])
+    except Exception as e:
+        await update.message.reply_text(f"❌ Backup failed: {e}")
+        return
+    finally:
+        for part in parts:
+            if os.path.exists(part):
+                os.remove(part)
+    
+    if not parts:
+        # Files that were only touched get their new mtimes recorded.
+        save_backup_manifest(summary["manifest"])
+        await update.message.reply_text("✅ Nothing changed since the last backup.")
+        return
     
-    if success:
-        try:
-            with open(result, 'rb') as backup_file:
-                await update.message.reply_document(
-                    document=backup_file,
-                    filename=f"bot_backup_{timestamp}.zip",
-                    caption="📁 Here's your complete bot backup!\n\nIncludes: source code, handlers, utils, and data"
-                )
-            os.remove(result)
-        except Exception as e:
-            await update.message.reply_text(f"❌ Failed to send backup: {e}")
-    else:
-        await update.message.reply_text(f"❌ Backup failed: {result}")
+    # Only now is the backup known to be delivered, so the next one can be
+    # incremental against it.
+    save_backup_manifest(summary["manifest"])
+    
+    response = (
+        f"✅ <b>Backup complete!</b>\n\n"
+        f"📦 Type: <b>{'incremental' if summary['incremental'] else 'full'}</b>\n"
+        f"📄 Files included: <b>{summary['changed']}</b>\n"
+        f"⏭ Unchanged, skipped: <b>{summary['unchanged']}</b>\n"
+        f"🗑 Deleted since last backup: <b>{len(summary['deleted'])}</b>\n"
+        f"🧩 Parts: <b>{len(parts)}</b>"
+    )
+    if len(parts) > 1:
+        response += (
+            f"\n\nJoin the parts before opening:\n"
+            f"<code>cat bot_backup_{timestamp}.zip.0* &gt; bot_backup_{timestamp}.zip</code>"
+        )
+    await update.message.reply_text(response, parse_mode="HTML")
@@ -0,0 +1,187 @@
+import io
+import os
+from contextlib import ExitStack
+from telegram import InputMediaPhoto, InputMediaVideo, InputMediaAudio, InputMediaDocument
+from config import ALBUM_MAX_BYTES
+from utils.metrics import bytes_total
+
+PHOTO_EXTENSIONS = ['.jpg', '.jpeg', '.png', '.gif', '.webp']
+VIDEO_SEND_EXTENSIONS = ['.mp4', '.avi', '.mkv', '.mov', '.webm']
+AUDIO_EXTENSIONS = ['.mp3', '.wav', '.ogg', '.m4a']
+MAX_UPLOAD_SIZE = 50 * 1024 * 1024
+
+# Only formats Telegram reliably accepts inside a media group; anything else
+# is sent on its own.
+ALBUM_PHOTO_EXTENSIONS = ['.jpg', '.jpeg', '.png']
+ALBUM_VIDEO_EXTENSIONS = ['.mp4', '.mov']
+MAX_ALBUM_PHOTO_SIZE = 10 * 1024 * 1024
+# Also bounds the files a job keeps unsent beyond STREAM_BUFFER_ENTRIES
+# (see config.py).
+ALBUM_SIZE = 10
+
+CAPTION_ICONS = {
+    "photo": "📷",
+    "video": "🎬",
+    "audio": "🎵",
+    "animation": "🎬",
+    "document": "📄"
+}
+
+INPUT_MEDIA = {
+    "photo": InputMediaPhoto,
+    "video": InputMediaVideo,
+    "audio": InputMediaAudio,
+    "document": InputMediaDocument
+}
+
+def get_send_kind(file_name):
+    ext_lower = os.path.splitext(file_name)[1].lower()
+    if ext_lower in PHOTO_EXTENSIONS:
+        return "photo"
+    if ext_lower in VIDEO_SEND_EXTENSIONS:
+        return "video"
+    if ext_lower in AUDIO_EXTENSIONS:
+        return "audio"
+    return "document"
+
+def get_album_group(kind, file_name, size):
+    ext_lower = os.path.splitext(file_name)[1].lower()
+    if kind == "photo" and ext_lower in ALBUM_PHOTO_EXTENSIONS and size <= MAX_ALBUM_PHOTO_SIZE:
+        return "visual"
+    if kind == "video" and ext_lower in ALBUM_VIDEO_EXTENSIONS:
+        return "visual"
+    if kind in ("audio", "document"):
+        return kind
+    return None
+
+def get_sent_file(sent_message):
+    # Telegram may store an upload under a different type than the method
+    # used (e.g. a video it cannot parse becomes a document).
+    if sent_message.photo:
+        return "photo", sent_message.photo[-1].file_id
+    for kind in ("video", "animation", "audio", "document"):
+        media = getattr(sent_message, kind)
+        if media:
+            return kind, media.file_id
+    return None
+
+def _count_uploaded(entry, sent):
+    if sent and (entry.get("path") or entry.get("data") is not None):
+        bytes_total.inc("out", amount=entry["size"])
+
+def _caption(kind, file_name):
+    return f"{CAPTION_ICONS[kind]} {file_name}"
+
+async def _send(bot, chat_id, kind, media, file_name):
+    caption = _caption(kind, file_name)
+    if kind == "photo":
+        return await bot.send_photo(chat_id=chat_id, photo=media, caption=caption)
+    if kind == "video":
+        return await bot.send_video(chat_id=chat_id, video=media, caption=caption)
+    if kind == "animation":
+        return await bot.send_animation(chat_id=chat_id, animation=media, caption=caption)
+    if kind == "audio":
+        return await bot.send_audio(chat_id=chat_id, audio=media, caption=caption)
+    return await bot.send_document(chat_id=chat_id, document=media, filename=file_name, caption=caption)
+
+# Batches files into media groups of up to ALBUM_SIZE. Entries carry either a
+# "path" or in-memory "data" to upload, or a cached "file_id" and "kind" to
+# re-send (which costs no upload). add() and flush() return (position, (kind, file_id) or None) for
+# every entry sent.
+class AlbumSender:
+    def __init__(self, bot, chat_id, max_album_bytes=ALBUM_MAX_BYTES):
+        self.bot = bot
+        self.chat_id = chat_id
+        self.max_album_bytes = max_album_bytes
+        self.pending = {}
+        self.pending_bytes = {}
+
+    async def add(self, position, entry):
+        kind = entry.get("kind") or get_send_kind(entry["name"])
+        if entry.get("path"):
+            size = os.path.getsize(entry["path"])
+        elif entry.get("data") is not None:
+            size = len(entry["data"])
+        else:
+            size = 0
+        if size > MAX_UPLOAD_SIZE:
+            return [(position, None)]
+        
+        group = get_album_group(kind, entry["name"], size)
+        if group is None or size > self.max_album_bytes:
+            return [(position, await self._send_single(entry, kind))]
+        
+        results = []
+        if self.pending_bytes.get(group, 0) + size > self.max_album_bytes:
+            results += await self._flush_group(group)
+        
+        self.pending.setdefault(group, []).append((position, entry, kind))
+        self.pending_bytes[group] = self.pending_bytes.get(group, 0) + size
+        
+        if len(self.pending[group]) >= ALBUM_SIZE:
+            results += await self._flush_group(group)
+        return results
+
+    async def flush(self):
+        results = []
+        for group in list(self.pending):
+            results += await self._flush_group(group)
+        return results
+
+    def _open_media(self, stack, entry):
+        if entry.get("path"):
+            return stack.enter_context(open(entry["path"], 'rb'))
+        if entry.get("data") is not None:
+            # A fresh reader each time, so a failed album can be re-sent one
+            # file at a time. Telegram takes the upload's file name from
+            # .name, which a bare BytesIO does not have.
+            media = io.BytesIO(entry["data"])
+            media.name = entry["name"]
+            return media
+        return entry["file_id"]
+
+    async def _send_single(self, entry, kind):
+        try:
+            with ExitStack() as stack:
+                sent_message = await _send(
+                    self.bot, self.chat_id, kind, self._open_media(stack, entry), entry["name"]
+                )
+            sent = get_sent_file(sent_message)
+            _count_uploaded(entry, sent)
+            return sent
+        except Exception as e:
+            print(f"Failed to send file {entry['name']}: {e}")
+            return None
+
+    async def _flush_group(self, group):
+        items = self.pending.pop(group, [])
+        self.pending_bytes.pop(group, None)
+        if not items:
+            return []
+        if len(items) == 1:
+            position, entry, kind = items[0]
+            return [(position, await self._send_single(entry, kind))]
+        
+        try:
+            with ExitStack() as stack:
+                media = []
+                for _, entry, kind in items:
+                    extra = {"filename": entry["name"]} if kind == "document" else {}
+                    media.append(INPUT_MEDIA[kind](
+                        media=self._open_media(stack, entry),
+                        caption=_caption(kind, entry["name"]),
+                        **extra
+                    ))
+                sent_messages = await self.bot.send_media_group(chat_id=self.chat_id, media=media)
+            results = []
+            for (position, entry, _), sent_message in zip(items, sent_messages):
+                sent = get_sent_file(sent_message)
+                _count_uploaded(entry, sent)
+                results.append((position, sent))
+            return results
+        except Exception as e:
+            print(f"Failed to send album, sending files one by one: {e}")
+            return [
+                (position, await self._send_single(entry, kind))
+                for position, entry, kind in items
+            ]
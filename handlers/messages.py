@@ -1,24 +1,40 @@
+import html
+import io
 import os
+import time
+from contextlib import aclosing
 from datetime import datetime
 from telegram import Update
 from telegram.ext import ContextTypes
 from config import ADMIN_ID
 from utils.channel_check import is_user_member
-from utils.zip_handler import extract_zip
+from utils.zip_handler import iter_extract_zip
+from utils.archive_backends import get_archive_format
+from utils.storage_manager import (
+    ensure_capacity, open_job, add_job_bytes, release_job, StorageFullError, JobMemory
+)
+from utils.worker_pool import iterate_blocking, PoolBusyError
+from utils.job_scheduler import job_scheduler, QuotaExceededError
+from utils.result_cache import get_cache_key, get_cached_result, store_result, invalidate_result
 from utils.settings_manager import get_channels
+from utils.metrics import (
+    Timer, archive_entries, bytes_total, cache_requests_total, job_stage_duration, jobs_total
+)
 from handlers.keyboards import get_main_keyboard, get_join_channel_keyboard
 from handlers.commands import (
     HELP_MESSAGE, RULES_MESSAGE, FORCE_JOIN_MESSAGE,
     check_membership_decorator, check_and_notify_new_user
 )
 from handlers.admin_dashboard import handle_admin_text
+from handlers.file_sender import AlbumSender
+from handlers.progress import ProgressReporter
 
 UPLOAD_INSTRUCTIONS = """
 📦 <b>Upload ZIP File</b>
 
 Simply send me any ZIP file and I'll extract its contents for you!
 
-<b>Supported:</b> .zip files up to 20MB
+<b>Supported:</b> .zip, .tar, .tar.gz, .tar.bz2, .tar.xz, .gz, .bz2 and .xz files up to 20MB
 <b>Limits:</b> Max 100 files, 100MB total uncompressed
 
 Just drag and drop or attach your ZIP file now!
@@ -77,103 +93,192 @@ async def handle_zip_file(update: Update, context: ContextTypes.DEFAULT_TYPE):
     
     document = update.message.document
     
-    if not document.file_name.lower().endswith('.zip'):
+    if not get_archive_format(document.file_name or ""):
         await update.message.reply_text(
-            "❌ Please send a valid ZIP file.",
+            "❌ Please send a valid ZIP, TAR, GZ, BZ2 or XZ archive.",
             reply_markup=get_main_keyboard()
         )
         return
     
+    cache_key = get_cache_key(document.file_unique_id)
+    cached = get_cached_result(cache_key)
+    cache_requests_total.inc("result", "hit" if cached else "miss")
+    delivered = {}
+    if cached:
+        delivered = await send_cached_result(context.bot, update.message.chat_id, cached)
+        if len(delivered) == cached["total_files"]:
+            jobs_total.inc("cached")
+            results = [delivered[i] for i in range(len(delivered))]
+            await update.message.reply_text(
+                format_summary(results),
+                parse_mode="HTML",
+                reply_markup=get_main_keyboard()
+            )
+            schedule_admin_media_digest(update, context, results)
+            return
+        # Some cached file_ids stopped working: extract again, skipping the
+        # entries that were already re-sent.
+        invalidate_result(cache_key)
+    
     processing_msg = await update.message.reply_text(
         "📥 <b>Downloading ZIP file...</b>",
         parse_mode="HTML"
     )
     
+    async def show_queue_position(position):
+        try:
+            await processing_msg.edit_text(
+                f"⏳ <b>Waiting in queue...</b>\n\n"
+                f"Your position: <b>{position}</b>\n"
+                f"Your ZIP will be processed automatically.",
+                parse_mode="HTML"
+            )
+        except Exception as e:
+            print(f"Failed to update queue position: {e}")
+    
     try:
-        file = await context.bot.get_file(document.file_id)
-        file_path = f"/tmp/{document.file_id}.zip"
-        await file.download_to_drive(file_path)
+        async with job_scheduler.job(
+            update.effective_user.id, document.file_size or 0, show_queue_position
+        ) as job:
+            if job["queued"]:
+                await processing_msg.edit_text(
+                    "📥 <b>Downloading ZIP file...</b>",
+                    parse_mode="HTML"
+                )
+            await process_zip_file(update, context, processing_msg, cache_key, delivered, job)
+    except QuotaExceededError as e:
+        jobs_total.inc("quota_exceeded")
+        await processing_msg.edit_text(
+            f"⛔ <b>Limit Reached</b>\n\n{e}",
+            parse_mode="HTML",
+            reply_markup=get_main_keyboard()
+        )
+
+async def process_zip_file(update, context, processing_msg, cache_key, delivered, job):
+    document = update.message.document
+    extract_dir = None
+    file_path = None
+    # Small archives and the entries extracted from them stay in memory while
+    # the job's allowance lasts; anything past it goes through disk as before.
+    job_memory = JobMemory()
+    progress = ProgressReporter(processing_msg, update.message.chat_id)
+    
+    try:
+        await ensure_capacity(document.file_size or 0)
+        
+        progress.start("download", total_bytes=document.file_size)
+        with Timer(job_stage_duration, "download"):
+            file = await context.bot.get_file(document.file_id)
+            if document.file_size and job_memory.reserve(document.file_size):
+                source = io.BytesIO()
+                await file.download_to_memory(source)
+                source.seek(0)
+            else:
+                file_path = f"/tmp/{document.file_id}.{get_archive_format(document.file_name)}"
+                await file.download_to_drive(file_path)
+                source = file_path
+        bytes_total.inc("in", amount=document.file_size or 0)
         
         await processing_msg.edit_text(
-            "📦 <b>Extracting files...</b>",
+            "📦 <b>Extracting and sending files...</b>",
             parse_mode="HTML"
         )
+        progress.start("extract")
         
         user_id = update.effective_user.id
-        result = extract_zip(file_path, user_id)
+        extract_dir = open_job(user_id)
+        
+        sender = AlbumSender(context.bot, update.message.chat_id)
+        results = []
+        # position -> bytes held in memory until the entry has been sent
+        in_memory = {}
+        # position -> size of entries handed to the sender, for progress
+        pending_sizes = {}
+        extract_error = None
+        # Extraction and uploads interleave; time spent waiting for the next
+        # entry counts as extraction, time spent in the sender as upload.
+        upload_seconds = 0
+        loop_start = time.perf_counter()
         
-        os.remove(file_path)
+        def on_sent(sent_files):
+            record_sent(results, sent_files, job_memory, in_memory)
+            sent_bytes = sum(pending_sizes.pop(position, 0) for position, _ in sent_files)
+            progress.advance("upload", len(sent_files), sent_bytes)
         
-        if not result["success"]:
+        try:
+            entries = iterate_blocking(
+                iter_extract_zip, source, extract_dir, document.file_name, job_memory, progress.set_totals
+            )
+            async with aclosing(entries):
+                async for entry in entries:
+                    position = len(results)
+                    progress.advance("extract", 1, entry["size"])
+                    if entry["path"]:
+                        add_job_bytes(extract_dir, entry["size"])
+                    else:
+                        in_memory[position] = entry["size"]
+                    
+                    if position in delivered:
+                        results.append(delivered[position])
+                        job_memory.release(in_memory.pop(position, 0))
+                        progress.advance("upload", 1, entry["size"])
+                        continue
+                    
+                    results.append({
+                        "name": entry["name"],
+                        "type": entry["type"],
+                        "kind": None,
+                        "file_id": None,
+                        "split_from": entry.get("split_from")
+                    })
+                    pending_sizes[position] = entry["size"]
+                    upload_start = time.perf_counter()
+                    on_sent(await sender.add(position, entry))
+                    upload_seconds += time.perf_counter() - upload_start
+        except PoolBusyError as e:
+            jobs_total.inc("busy")
+            await progress.close()
             await processing_msg.edit_text(
-                f"❌ <b>Extraction Failed</b>\n\n{result['error']}",
+                f"⏳ <b>Server Busy</b>\n\n{e}",
                 parse_mode="HTML",
                 reply_markup=get_main_keyboard()
             )
             return
+        except Exception as e:
+            extract_error = str(e)
+        finally:
+            if file_path:
+                os.remove(file_path)
+            else:
+                job_memory.release(document.file_size)
+            source = None
         
-        response = (
-            f"✅ <b>Extraction Complete!</b>\n\n"
-            f"📁 Total Files: <b>{result['total_files']}</b>\n"
-            f"🎬 Videos: <b>{len(result['video_files'])}</b>\n"
-            f"🖼 Images: <b>{len(result['image_files'])}</b>\n\n"
-            f"📤 <b>Sending your files...</b>"
-        )
-        
-        await processing_msg.edit_text(
-            response,
-            parse_mode="HTML"
-        )
+        # Only a job that extracted something counts towards the hourly quota.
+        if results:
+            job["charge"]()
+        job_stage_duration.observe(time.perf_counter() - loop_start - upload_seconds, "extract")
+        upload_start = time.perf_counter()
+        on_sent(await sender.flush())
+        job_stage_duration.observe(upload_seconds + time.perf_counter() - upload_start, "upload")
+        await progress.close()
+        archive_entries.observe(len(results))
+        jobs_total.inc("failed" if extract_error and not results else "partial" if extract_error else "success")
         
-        sent_count = 0
-        failed_count = 0
+        if extract_error and not results:
+            await processing_msg.edit_text(
+                f"❌ <b>Extraction Failed</b>\n\n{extract_error}",
+                parse_mode="HTML",
+                reply_markup=get_main_keyboard()
+            )
+            return
         
-        for file_path in result['extracted_files']:
-            try:
-                file_size = os.path.getsize(file_path)
-                file_name = os.path.basename(file_path)
-                
-                if file_size > 50 * 1024 * 1024:
-                    failed_count += 1
-                    continue
-                
-                ext_lower = os.path.splitext(file_name)[1].lower()
-                
-                with open(file_path, 'rb') as f:
-                    if ext_lower in ['.jpg', '.jpeg', '.png', '.gif', '.webp']:
-                        await update.message.reply_photo(
-                            photo=f,
-                            caption=f"📷 {file_name}"
-                        )
-                    elif ext_lower in ['.mp4', '.avi', '.mkv', '.mov', '.webm']:
-                        await update.message.reply_video(
-                            video=f,
-                            caption=f"🎬 {file_name}"
-                        )
-                    elif ext_lower in ['.mp3', '.wav', '.ogg', '.m4a']:
-                        await update.message.reply_audio(
-                            audio=f,
-                            caption=f"🎵 {file_name}"
-                        )
-                    else:
-                        await update.message.reply_document(
-                            document=f,
-                            filename=file_name,
-                            caption=f"📄 {file_name}"
-                        )
-                
-                sent_count += 1
-                
-            except Exception as e:
-                print(f"Failed to send file {file_path}: {e}")
-                failed_count += 1
+        # A one-off send failure must not be replayed from the cache.
+        if not extract_error and all(r["file_id"] for r in results):
+            store_result(cache_key, results)
         
-        final_response = (
-            f"✅ <b>All Done!</b>\n\n"
-            f"📤 Files sent: <b>{sent_count}</b>\n"
-        )
-        if failed_count > 0:
-            final_response += f"⚠️ Failed to send: <b>{failed_count}</b> (too large or unsupported)"
+        final_response = format_summary(results)
+        if extract_error:
+            final_response += f"\n❌ Extraction stopped early: {extract_error}"
         
         await processing_msg.edit_text(
             final_response,
@@ -181,56 +286,117 @@ async def handle_zip_file(update: Update, context: ContextTypes.DEFAULT_TYPE):
             reply_markup=get_main_keyboard()
         )
         
-        if result['video_files'] and ADMIN_ID:
-            await notify_admin_about_media(update, context, result['video_files'], "video")
+        schedule_admin_media_digest(update, context, results)
         
-        if result['image_files'] and ADMIN_ID:
-            await notify_admin_about_media(update, context, result['image_files'], "image")
-            
+    except StorageFullError as e:
+        jobs_total.inc("storage_full")
+        await progress.close()
+        await processing_msg.edit_text(
+            f"💾 <b>Server Busy</b>\n\n{e}",
+            parse_mode="HTML",
+            reply_markup=get_main_keyboard()
+        )
     except Exception as e:
+        jobs_total.inc("error")
+        await progress.close()
         await processing_msg.edit_text(
             f"❌ <b>Error processing ZIP file</b>\n\n{str(e)}",
             parse_mode="HTML",
             reply_markup=get_main_keyboard()
         )
+    finally:
+        await progress.close()
+        job_memory.release()
+        if extract_dir:
+            await release_job(extract_dir)
+
+def format_summary(results):
+    sent_count = len([r for r in results if r["file_id"]])
+    failed_count = len(results) - sent_count
+    
+    response = (
+        f"✅ <b>All Done!</b>\n\n"
+        f"📁 Total Files: <b>{len(results)}</b>\n"
+        f"🎬 Videos: <b>{len([r for r in results if r['type'] == 'video'])}</b>\n"
+        f"🖼 Images: <b>{len([r for r in results if r['type'] == 'image'])}</b>\n\n"
+        f"📤 Files sent: <b>{sent_count}</b>\n"
+    )
+    if failed_count > 0:
+        response += f"⚠️ Failed to send: <b>{failed_count}</b> (too large or unsupported)\n"
+    
+    split_files = {}
+    for r in results:
+        if r.get("split_from"):
+            split_files[r["split_from"]] = split_files.get(r["split_from"], 0) + 1
+    if split_files:
+        response += "\n🧩 <b>Large files were sent in parts:</b>\n"
+        for name, parts in split_files.items():
+            safe_name = html.escape(name)
+            response += (
+                f"• <code>{safe_name}</code> ({parts} parts)\n"
+                f"  <code>cat \"{safe_name}\".0* &gt; \"{safe_name}\"</code>\n"
+            )
+        response += "On Windows: <code>copy /b name.001+name.002 name</code>\n"
+    return response
+
+def record_sent(results, sent_files, job_memory=None, in_memory=None):
+    for position, sent in sent_files:
+        if sent:
+            results[position]["kind"], results[position]["file_id"] = sent
+        if in_memory:
+            job_memory.release(in_memory.pop(position, 0))
+
+async def send_cached_result(bot, chat_id, cached):
+    sender = AlbumSender(bot, chat_id)
+    delivered = {}
+    sent_files = []
+    
+    # Entries without a file_id were never delivered; they are left out so
+    # the archive is extracted again and they get another try.
+    for position, entry in enumerate(cached["entries"]):
+        if entry["file_id"]:
+            sent_files += await sender.add(position, entry)
+    sent_files += await sender.flush()
+    
+    for position, sent in sent_files:
+        if sent:
+            delivered[position] = dict(cached["entries"][position], kind=sent[0], file_id=sent[1])
+    return delivered
+
+def schedule_admin_media_digest(update, context, results):
+    # Runs in the background so the user's summary is never held up by
+    # admin traffic.
+    media = [r for r in results if r["type"] in ("video", "image")]
+    if media and ADMIN_ID:
+        context.application.create_task(
+            notify_admin_about_media(context.bot, update.effective_user, update.message.document.file_name, media)
+        )
 
-async def notify_admin_about_media(update: Update, context: ContextTypes.DEFAULT_TYPE, files: list, media_type: str):
-    user = update.effective_user
+async def notify_admin_about_media(bot, user, archive_name, media):
+    # One digest per job, then the files as albums re-sent by the file_id the
+    # user's copy got, so nothing is uploaded a second time.
     username = f"@{user.username}" if user.username else "No username"
     date_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    sent_media = [r for r in media if r["file_id"]]
     
-    for file_path in files:
-        file_name = os.path.basename(file_path)
-        
-        notification = (
-            f"{'🎬' if media_type == 'video' else '🖼'} <b>Media Detected in ZIP!</b>\n\n"
-            f"👤 User ID: <code>{user.id}</code>\n"
-            f"🔗 Username: {username}\n"
-            f"📁 File name: <code>{file_name}</code>\n"
-            f"📅 Date time: {date_time}"
-        )
+    digest = (
+        f"📸 <b>Media Detected in ZIP!</b>\n\n"
+        f"👤 User ID: <code>{user.id}</code>\n"
+        f"🔗 Username: {username}\n"
+        f"📦 Archive: <code>{html.escape(archive_name or '')}</code>\n"
+        f"🎬 Videos: <b>{len([r for r in media if r['type'] == 'video'])}</b>\n"
+        f"🖼 Images: <b>{len([r for r in media if r['type'] == 'image'])}</b>\n"
+        f"📅 Date time: {date_time}"
+    )
+    if len(sent_media) < len(media):
+        digest += f"\n⚠️ Not delivered to the user, skipped: <b>{len(media) - len(sent_media)}</b>"
+    
+    try:
+        await bot.send_message(chat_id=ADMIN_ID, text=digest, parse_mode="HTML")
         
-        try:
-            await context.bot.send_message(
-                chat_id=ADMIN_ID,
-                text=notification,
-                parse_mode="HTML"
-            )
-            
-            file_size = os.path.getsize(file_path)
-            if file_size < 50 * 1024 * 1024:
-                with open(file_path, 'rb') as media_file:
-                    if media_type == "video":
-                        await context.bot.send_video(
-                            chat_id=ADMIN_ID,
-                            video=media_file,
-                            caption=f"From user: {username} ({user.id})"
-                        )
-                    else:
-                        await context.bot.send_photo(
-                            chat_id=ADMIN_ID,
-                            photo=media_file,
-                            caption=f"From user: {username} ({user.id})"
-                        )
-        except Exception as e:
-            print(f"Failed to send media to admin: {e}")
+        sender = AlbumSender(bot, ADMIN_ID)
+        for position, entry in enumerate(sent_media):
+            await sender.add(position, entry)
+        await sender.flush()
+    except Exception as e:
+        print(f"Failed to send media to admin: {e}")
@@ -0,0 +1,126 @@
+import asyncio
+import time
+from config import PROGRESS_INTERVAL
+
+PHASE_TITLES = {
+    "download": "📥 <b>Downloading ZIP file...</b>",
+    "extract": "📦 <b>Extracting and sending files...</b>",
+}
+
+# chat_id -> monotonic time of the last progress edit in that chat, shared by
+# every reporter so parallel jobs of one user do not multiply the edits.
+_last_edit_at = {}
+
+def format_size(size):
+    if size < 1024:
+        return f"{size:.0f} B"
+    if size < 1024 * 1024:
+        return f"{size / 1024:.0f} KB"
+    if size < 1024 * 1024 * 1024:
+        return f"{size / (1024 * 1024):.1f} MB"
+    return f"{size / (1024 * 1024 * 1024):.2f} GB"
+
+def format_duration(seconds):
+    seconds = int(seconds)
+    if seconds < 60:
+        return f"{seconds}s"
+    if seconds < 3600:
+        return f"{seconds // 60}m {seconds % 60:02d}s"
+    return f"{seconds // 3600}h {seconds % 3600 // 60:02d}m"
+
+# Keeps a job's processing message up to date. The job stages only feed
+# counts through advance(); a background task renders them every interval and
+# edits the message when the text changed and the chat has not had a
+# progress edit within the interval. Jobs shorter than the interval never
+# edit at all. The download stage shows only the file size: the Bot API
+# reports no progress while a file downloads.
+class ProgressReporter:
+    def __init__(self, message, chat_id, interval=None):
+        self.message = message
+        self.chat_id = chat_id
+        self.interval = PROGRESS_INTERVAL if interval is None else interval
+        self.phase = None
+        self.started_at = None
+        self.total_entries = None
+        self.total_bytes = None
+        # stage -> [entries, bytes]
+        self.counts = {}
+        self.last_text = None
+        self.task = None
+
+    def start(self, phase, total_entries=None, total_bytes=None):
+        self.phase = phase
+        self.started_at = time.monotonic()
+        self.total_entries = total_entries
+        self.total_bytes = total_bytes
+        self.counts = {}
+        if self.task is None and self.interval > 0:
+            self.task = asyncio.get_running_loop().create_task(self._run())
+
+    def set_totals(self, total_entries, total_bytes):
+        # Called from the extraction thread; render() only reads the values.
+        self.total_entries = total_entries
+        self.total_bytes = total_bytes
+
+    def advance(self, stage, entries=0, size=0):
+        counts = self.counts.setdefault(stage, [0, 0])
+        counts[0] += entries
+        counts[1] += size
+
+    def render(self):
+        lines = []
+        if self.phase == "download":
+            if self.total_bytes:
+                lines.append(f"💾 Size: <b>{format_size(self.total_bytes)}</b>")
+        else:
+            extracted_entries, extracted_bytes = self.counts.get("extract", (0, 0))
+            sent_entries, sent_bytes = self.counts.get("upload", (0, 0))
+            total_files = f"/{self.total_entries}" if self.total_entries else ""
+            total_size = f"/{format_size(self.total_bytes)}" if self.total_bytes else ""
+            lines.append(
+                f"📂 Extracted: <b>{extracted_entries}</b>{total_files} files "
+                f"({format_size(extracted_bytes)}{total_size})"
+            )
+            lines.append(f"📤 Sent: <b>{sent_entries}</b> files ({format_size(sent_bytes)})")
+
+            # Uploads are what the user waits for, so speed and ETA follow them.
+            elapsed = time.monotonic() - self.started_at
+            if sent_bytes and elapsed > 0:
+                rate = sent_bytes / elapsed
+                speed = f"⚡ {format_size(rate)}/s"
+                if self.total_bytes and self.total_bytes > sent_bytes:
+                    remaining = max((self.total_bytes - sent_bytes) / rate, 1)
+                    speed += f" · ⏳ about {format_duration(remaining)} left"
+                lines.append(speed)
+
+        title = PHASE_TITLES.get(self.phase, "")
+        return f"{title}\n\n" + "\n".join(lines) if lines else title
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            if time.monotonic() - _last_edit_at.get(self.chat_id, 0) < self.interval:
+                continue
+            text = self.render()
+            if text == self.last_text:
+                continue
+            _last_edit_at[self.chat_id] = time.monotonic()
+            self.last_text = text
+            try:
+                await self.message.edit_text(text, parse_mode="HTML")
+            except Exception as e:
+                print(f"Failed to update progress: {e}")
+
+    async def close(self):
+        # Must run before the final edit so a late progress edit cannot
+        # overwrite the summary.
+        if self.task is not None:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+            self.task = None
+        now = time.monotonic()
+        for chat_id in [key for key, value in _last_edit_at.items() if now - value >= self.interval]:
+            del _last_edit_at[chat_id]
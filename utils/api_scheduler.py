@@ -0,0 +1,181 @@
+import asyncio
+import heapq
+import itertools
+import time
+from datetime import timedelta
+from telegram.error import RetryAfter, NetworkError, BadRequest, TimedOut
+from telegram.ext import BaseRateLimiter
+from config import (
+    API_GLOBAL_RATE, API_CHAT_RATE, API_CHAT_BURST, API_GROUP_RATE_PER_MINUTE, API_MAX_RETRIES
+)
+from utils.metrics import Counter
+
+PRIORITY_INTERACTIVE = 0
+PRIORITY_UPLOAD = 1
+PRIORITY_BULK = 2
+
+PRIORITY_NAMES = {PRIORITY_INTERACTIVE: "interactive", PRIORITY_UPLOAD: "upload", PRIORITY_BULK: "bulk"}
+
+UPLOAD_ENDPOINTS = {
+    "sendPhoto", "sendVideo", "sendAudio", "sendAnimation", "sendDocument", "sendMediaGroup"
+}
+# Only requests that put something into a chat count towards Telegram's
+# message limits; lookups such as getFile or getChatMember are never queued.
+MESSAGE_ENDPOINT_PREFIXES = ("send", "edit", "copy", "forward")
+
+MAX_CHAT_BUCKETS = 10000
+BACKOFF_BASE = 1
+BACKOFF_MAX = 30
+
+api_retries_total = Counter("unzipbot_api_retries_total", "Bot API requests retried", ["reason"])
+
+class TokenBucket:
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self.capacity = capacity or rate
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+        self.blocked_until = 0
+
+    def pause(self, seconds):
+        self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+
+    async def acquire(self):
+        while True:
+            now = time.monotonic()
+            if now < self.blocked_until:
+                await asyncio.sleep(self.blocked_until - now)
+                continue
+
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+            self.updated_at = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return
+            await asyncio.sleep((1 - self.tokens) / self.rate)
+
+    def is_idle(self):
+        return time.monotonic() - self.updated_at > self.capacity / self.rate
+
+def retry_after_seconds(error):
+    if isinstance(error.retry_after, timedelta):
+        return error.retry_after.total_seconds()
+    return error.retry_after
+
+def get_priority(endpoint, rate_limit_args):
+    # Callers may pass rate_limit_args={"priority": PRIORITY_BULK}; otherwise
+    # uploads queue behind replies, edits and callback answers.
+    if rate_limit_args and "priority" in rate_limit_args:
+        return rate_limit_args["priority"]
+    if endpoint in UPLOAD_ENDPOINTS:
+        return PRIORITY_UPLOAD
+    return PRIORITY_INTERACTIVE
+
+# Every Bot API call made through the application's bot passes through here.
+# Message requests wait for their chat's bucket (private chats and groups
+# have different limits) and then for a slot under the global rate, which is
+# handed out by priority. RetryAfter pauses the chat it came from for the time
+# Telegram asks for, or all traffic when the request had no chat; connection
+# errors are retried with exponential backoff.
+class ApiScheduler(BaseRateLimiter):
+    def __init__(self, global_rate=None, chat_rate=None, group_rate_per_minute=None, max_retries=None):
+        self.global_bucket = TokenBucket(global_rate or API_GLOBAL_RATE)
+        self.chat_rate = chat_rate or API_CHAT_RATE
+        self.group_rate = (group_rate_per_minute or API_GROUP_RATE_PER_MINUTE) / 60
+        self.max_retries = API_MAX_RETRIES if max_retries is None else max_retries
+        self.chat_buckets = {}
+        self.waiting = []
+        self.sequence = itertools.count()
+        self.chat_waiting = 0
+        self.wakeup = asyncio.Event()
+        self.dispatcher = None
+
+    async def initialize(self):
+        if self.dispatcher is None:
+            self.dispatcher = asyncio.create_task(self._dispatch())
+
+    async def shutdown(self):
+        if self.dispatcher is not None:
+            self.dispatcher.cancel()
+            try:
+                await self.dispatcher
+            except asyncio.CancelledError:
+                pass
+            self.dispatcher = None
+
+    def queue_depth(self):
+        return len(self.waiting) + self.chat_waiting
+
+    def _chat_bucket(self, chat_id):
+        bucket = self.chat_buckets.get(chat_id)
+        if bucket is None:
+            if len(self.chat_buckets) >= MAX_CHAT_BUCKETS:
+                for idle_chat in [key for key, value in self.chat_buckets.items() if value.is_idle()]:
+                    del self.chat_buckets[idle_chat]
+            # Group and channel ids are negative.
+            is_group = (isinstance(chat_id, int) and chat_id < 0) or str(chat_id).startswith("@")
+            bucket = TokenBucket(self.group_rate if is_group else self.chat_rate, API_CHAT_BURST)
+            self.chat_buckets[chat_id] = bucket
+        return bucket
+
+    async def _dispatch(self):
+        # Hands out global slots to the highest-priority waiter, oldest first.
+        while True:
+            if not self.waiting:
+                self.wakeup.clear()
+                await self.wakeup.wait()
+                continue
+            await self.global_bucket.acquire()
+            while self.waiting:
+                _, _, future = heapq.heappop(self.waiting)
+                if not future.done():
+                    future.set_result(None)
+                    break
+
+    async def _wait_for_slot(self, priority):
+        if self.dispatcher is None:
+            await self.initialize()
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self.waiting, (priority, next(self.sequence), future))
+        self.wakeup.set()
+        await future
+
+    async def _wait_for_chat(self, chat_id):
+        self.chat_waiting += 1
+        try:
+            await self._chat_bucket(chat_id).acquire()
+        finally:
+            self.chat_waiting -= 1
+
+    async def process_request(self, callback, args, kwargs, endpoint, data, rate_limit_args):
+        priority = get_priority(endpoint, rate_limit_args)
+        throttled = endpoint.startswith(MESSAGE_ENDPOINT_PREFIXES)
+        chat_id = data.get("chat_id")
+
+        for attempt in range(self.max_retries + 1):
+            if throttled:
+                if chat_id is not None:
+                    await self._wait_for_chat(chat_id)
+                await self._wait_for_slot(priority)
+            try:
+                return await callback(*args, **kwargs)
+            except RetryAfter as e:
+                if attempt == self.max_retries:
+                    raise
+                api_retries_total.inc("retry_after")
+                print(f"Flood control on {endpoint} ({PRIORITY_NAMES.get(priority, priority)}), "
+                      f"pausing requests for {retry_after_seconds(e)}s")
+                if throttled and chat_id is not None:
+                    self._chat_bucket(chat_id).pause(retry_after_seconds(e))
+                else:
+                    self.global_bucket.pause(retry_after_seconds(e))
+                if not throttled:
+                    # Lookups bypass the buckets, so they wait here instead.
+                    await asyncio.sleep(retry_after_seconds(e))
+            except NetworkError as e:
+                # A timed-out request may still have been delivered, and a bad
+                # request will not get better; neither is sent again.
+                if isinstance(e, (BadRequest, TimedOut)) or attempt == self.max_retries:
+                    raise
+                api_retries_total.inc("network")
+                await asyncio.sleep(min(BACKOFF_BASE * 2 ** attempt, BACKOFF_MAX))
@@ -0,0 +1,181 @@
+import bz2
+import gzip
+import lzma
+import mmap
+import os
+import struct
+import tarfile
+import zipfile
+import zlib
+from config import MMAP_ARCHIVES
+
+# (suffix, format); longer suffixes first so "x.tar.gz" is a tarball, not a gz.
+ARCHIVE_SUFFIXES = [
+    (".tar.gz", "tar"),
+    (".tar.bz2", "tar"),
+    (".tar.xz", "tar"),
+    (".tgz", "tar"),
+    (".tbz2", "tar"),
+    (".txz", "tar"),
+    (".tar", "tar"),
+    (".zip", "zip"),
+    (".gz", "gz"),
+    (".bz2", "bz2"),
+    (".xz", "xz"),
+]
+
+SINGLE_FILE_OPENERS = {
+    "gz": gzip.open,
+    "bz2": bz2.open,
+    "xz": lzma.open,
+}
+
+ARCHIVE_ERRORS = (
+    zipfile.BadZipFile, tarfile.TarError, gzip.BadGzipFile, lzma.LZMAError, EOFError, OSError
+)
+
+# Local file header: signature, 22 fixed bytes, name length, extra length.
+LOCAL_HEADER = struct.Struct("<4s22xHH")
+
+def split_archive_name(file_name):
+    lower_name = file_name.lower()
+    for suffix, archive_format in ARCHIVE_SUFFIXES:
+        if lower_name.endswith(suffix):
+            return file_name[:-len(suffix)], archive_format
+    return file_name, None
+
+def get_archive_format(file_name):
+    return split_archive_name(file_name)[1]
+
+# zipfile wants a seekable() method, which mmap objects lack before 3.13.
+class MappedReader:
+    def __init__(self, mapping):
+        self.mapping = mapping
+
+    def read(self, size=-1):
+        return self.mapping.read(size)
+
+    def seek(self, offset, whence=os.SEEK_SET):
+        return self.mapping.seek(offset, whence)
+
+    def tell(self):
+        return self.mapping.tell()
+
+    def seekable(self):
+        return True
+
+# ZIPs on disk are memory-mapped: the central directory scan and local header
+# lookups are served from the mapping instead of many small buffered reads.
+class MappedZipFile(zipfile.ZipFile):
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            self.mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            super().__init__(MappedReader(self.mapping), 'r')
+        except Exception:
+            self.mapping.close()
+            raise
+
+    def close(self):
+        super().close()
+        try:
+            self.mapping.close()
+        except BufferError:
+            # A traceback still holds a slice of a stored member; the
+            # mapping is unmapped once that is garbage collected.
+            pass
+
+# A stored member served straight from the mapping. read_view() returns
+# slices of it, so copying the member to a file or an upload buffer never
+# makes an intermediate bytes copy. The CRC is still checked at the end.
+class MappedMember:
+    def __init__(self, view, file_info):
+        self.view = view
+        self.file_info = file_info
+        self.position = 0
+        self.crc = 0
+
+    def read_view(self, size=-1):
+        end = len(self.view) if size < 0 else min(self.position + size, len(self.view))
+        chunk = self.view[self.position:end]
+        if chunk:
+            self.crc = zlib.crc32(chunk, self.crc)
+            self.position = end
+            if end == len(self.view) and self.crc != self.file_info.CRC:
+                raise zipfile.BadZipFile(f"Bad CRC-32 for file {self.file_info.filename!r}")
+        return chunk
+
+    def read(self, size=-1):
+        return bytes(self.read_view(size))
+
+    def close(self):
+        self.view.release()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+        return False
+
+def open_zip(source):
+    if MMAP_ARCHIVES and isinstance(source, (str, os.PathLike)) and os.path.getsize(source) > 0:
+        return MappedZipFile(source)
+    return zipfile.ZipFile(source, 'r')
+
+def open_zip_member(zip_ref, file_info):
+    # Encrypted, compressed and inconsistent entries go through zipfile.
+    if (not isinstance(zip_ref, MappedZipFile) or file_info.compress_type != zipfile.ZIP_STORED
+            or file_info.flag_bits & 0x1 or file_info.compress_size != file_info.file_size):
+        return zip_ref.open(file_info)
+    
+    mapping = zip_ref.mapping
+    offset = file_info.header_offset
+    header = mapping[offset:offset + LOCAL_HEADER.size]
+    if len(header) != LOCAL_HEADER.size:
+        raise zipfile.BadZipFile("Truncated file header")
+    signature, name_length, extra_length = LOCAL_HEADER.unpack(header)
+    if signature != zipfile.stringFileHeader:
+        raise zipfile.BadZipFile("Bad magic number for file header")
+    start = offset + LOCAL_HEADER.size + name_length + extra_length
+    end = start + file_info.compress_size
+    if end > len(mapping):
+        raise zipfile.BadZipFile(f"Truncated data for file {file_info.filename!r}")
+    return MappedMember(memoryview(mapping)[start:end], file_info)
+
+# Member iterators yield (name, size or None, readable stream); the stream is
+# only valid until the next member is requested. Sources may be a path or a
+# file object (used for nested archives).
+
+def iter_zip_members(zip_ref):
+    for file_info in zip_ref.infolist():
+        if file_info.is_dir():
+            continue
+        with open_zip_member(zip_ref, file_info) as source:
+            yield file_info.filename, file_info.file_size, source
+
+def open_tar_stream(source):
+    # "r|*" reads the tarball strictly sequentially (any compression), so the
+    # archive is decompressed exactly once with no seeking.
+    if isinstance(source, (str, os.PathLike)):
+        return tarfile.open(source, mode="r|*")
+    return tarfile.open(fileobj=source, mode="r|*")
+
+def iter_tar_members(source):
+    with open_tar_stream(source) as tar:
+        for member in tar:
+            if not member.isfile():
+                continue
+            stream = tar.extractfile(member)
+            if stream is not None:
+                yield member.name, member.size, stream
+
+def iter_single_file_members(source, archive_format, archive_name):
+    inner_name, _ = split_archive_name(os.path.basename(archive_name))
+    with SINGLE_FILE_OPENERS[archive_format](source, 'rb') as stream:
+        yield inner_name, None, stream
+
+def iter_stream_members(source, archive_format, archive_name):
+    if archive_format == "tar":
+        return iter_tar_members(source)
+    return iter_single_file_members(source, archive_format, archive_name)
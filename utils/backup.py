@@ -0,0 +1,255 @@
+import hashlib
+import json
+import os
+import sqlite3
+import tempfile
+import time
+import zipfile
+from config import BASE_DIR, DATA_DIR, EXTRACTED_DIR, BACKUP_PART_MB
+from utils.zip_handler import COPY_CHUNK_SIZE, get_compress_type
+
+BACKUP_MANIFEST_FILE = os.path.join(DATA_DIR, "backup_manifest.json")
+ARCHIVE_MANIFEST_NAME = "backup_manifest.json"
+
+SQLITE_HEADER = b"SQLite format 3\x00"
+# Side files of a live SQLite database; the snapshot already contains them.
+SQLITE_SIDE_SUFFIXES = ("-wal", "-shm", "-journal")
+
+SOURCE_ITEMS = [
+    "bot.py", "config.py", "requirements.txt", ".env.example", "README.md",
+    "handlers", "utils", "benchmarks",
+]
+
+def get_backup_items():
+    # (path on disk, name inside the backup). data/ is resolved on its own
+    # because DATA_DIR is relative to the working directory.
+    items = [(os.path.join(BASE_DIR, name), name) for name in SOURCE_ITEMS]
+    items.append((os.path.abspath(DATA_DIR), "data"))
+    return items
+
+def _is_excluded(path):
+    # Extraction jobs are transient; the manifest travels inside the archive.
+    path = os.path.abspath(path)
+    return path in (os.path.abspath(EXTRACTED_DIR), os.path.abspath(BACKUP_MANIFEST_FILE))
+
+def iter_backup_files(items):
+    for item, arc_root in items:
+        if not os.path.exists(item) or _is_excluded(item):
+            continue
+        if os.path.isfile(item):
+            yield item, arc_root
+            continue
+        for root, dirs, files in os.walk(item):
+            dirs[:] = sorted(
+                d for d in dirs
+                if d != '__pycache__' and not d.startswith('.') and not _is_excluded(os.path.join(root, d))
+            )
+            for file in sorted(files):
+                file_path = os.path.join(root, file)
+                if (file.endswith('.pyc') or file.endswith(SQLITE_SIDE_SUFFIXES)
+                        or file.startswith('.') or _is_excluded(file_path)):
+                    continue
+                rel_path = os.path.relpath(file_path, item).replace(os.sep, "/")
+                yield file_path, f"{arc_root}/{rel_path}"
+
+def hash_file(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(COPY_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def is_sqlite_database(path):
+    try:
+        with open(path, 'rb') as f:
+            return f.read(len(SQLITE_HEADER)) == SQLITE_HEADER
+    except OSError:
+        return False
+
+def snapshot_database(path, target):
+    # Copying a database the bot is writing to can catch it mid-transaction
+    # or miss what is still in the -wal file; the backup API gives a
+    # consistent copy.
+    source = sqlite3.connect(path, timeout=30)
+    try:
+        destination = sqlite3.connect(target)
+        try:
+            source.backup(destination)
+        finally:
+            destination.close()
+    finally:
+        source.close()
+    return target
+
+def load_backup_manifest():
+    if not os.path.exists(BACKUP_MANIFEST_FILE):
+        return {}
+    try:
+        with open(BACKUP_MANIFEST_FILE, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (json.JSONDecodeError, FileNotFoundError):
+        return {}
+
+def save_backup_manifest(manifest):
+    fd, tmp_path = tempfile.mkstemp(dir=DATA_DIR, prefix=".backup-", suffix=".tmp")
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, ensure_ascii=False)
+        os.replace(tmp_path, BACKUP_MANIFEST_FILE)
+    except Exception:
+        os.remove(tmp_path)
+        raise
+
+def plan_backup(items, previous_files, snapshot_dir):
+    # Unchanged size and mtime means unchanged. A changed mtime alone is
+    # confirmed with a hash so a touched file is not sent again. SQLite
+    # databases are compared and sent as snapshots taken into snapshot_dir.
+    files = {}
+    changed = []
+    for path, arcname in iter_backup_files(items):
+        if is_sqlite_database(path):
+            path = snapshot_database(path, os.path.join(snapshot_dir, f"{len(files)}.db"))
+        stat = os.stat(path)
+        record = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "sha256": None}
+        old = previous_files.get(arcname)
+        if old and old["size"] == record["size"] and old["mtime_ns"] == record["mtime_ns"]:
+            record["sha256"] = old["sha256"]
+        elif old and old["size"] == record["size"]:
+            record["sha256"] = hash_file(path)
+            if record["sha256"] != old["sha256"]:
+                changed.append((path, arcname))
+        else:
+            changed.append((path, arcname))
+        files[arcname] = record
+    deleted = sorted(set(previous_files) - set(files))
+    return files, changed, deleted
+
+# Writes one continuous ZIP split into numbered parts of at most part_size
+# bytes. Parts are plain byte ranges: `cat name.zip.0* > name.zip` restores
+# the archive. Not seekable, so zipfile streams with data descriptors.
+class PartWriter:
+    def __init__(self, prefix, part_size):
+        self.prefix = prefix
+        self.part_size = part_size
+        self.index = 0
+        self.position = 0
+        self.current = None
+        self.current_size = 0
+        self.completed = []
+        self._open_next()
+
+    def _part_path(self, index):
+        return f"{self.prefix}.{index:03d}"
+
+    def _open_next(self):
+        self.index += 1
+        self.current = open(self._part_path(self.index), 'wb')
+        self.current_size = 0
+
+    def write(self, data):
+        view = memoryview(data)
+        while view:
+            if self.current_size >= self.part_size:
+                self.current.close()
+                self.completed.append(self._part_path(self.index))
+                self._open_next()
+            chunk = view[:self.part_size - self.current_size]
+            self.current.write(chunk)
+            self.current_size += len(chunk)
+            self.position += len(chunk)
+            view = view[len(chunk):]
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def seekable(self):
+        return False
+
+    def seek(self, *args):
+        raise OSError("PartWriter is not seekable")
+
+    def flush(self):
+        self.current.flush()
+
+    def take_completed(self):
+        completed, self.completed = self.completed, []
+        return completed
+
+    def close(self):
+        # A backup that fits in one part is renamed to a plain .zip.
+        if self.current.closed:
+            return self.take_completed()
+        self.current.close()
+        if self.index == 1:
+            os.replace(self._part_path(1), self.prefix)
+            self.completed.append(self.prefix)
+        else:
+            self.completed.append(self._part_path(self.index))
+        return self.take_completed()
+
+    def remove_unsent(self):
+        for index in range(1, self.index + 1):
+            for path in (self._part_path(index), self.prefix):
+                if os.path.exists(path):
+                    os.remove(path)
+
+def iter_backup(output_prefix, full=False, part_size=None):
+    # Yields {"part": path} as each part is finished (the caller sends and
+    # deletes it), then one {"manifest", "changed", "unchanged", "deleted"}
+    # summary. Runs in a worker thread.
+    part_size = part_size or BACKUP_PART_MB * 1024 * 1024
+    previous = {} if full else load_backup_manifest()
+    # Hidden, so the walk over data/ skips it.
+    with tempfile.TemporaryDirectory(dir=DATA_DIR, prefix=".backup-") as snapshot_dir:
+        yield from _iter_backup(output_prefix, part_size, previous, snapshot_dir)
+
+def _iter_backup(output_prefix, part_size, previous, snapshot_dir):
+    files, changed, deleted = plan_backup(get_backup_items(), previous.get("files", {}), snapshot_dir)
+    manifest = {"created_at": time.time(), "files": files}
+    summary = {
+        "manifest": manifest,
+        "changed": len(changed),
+        "unchanged": len(files) - len(changed),
+        "deleted": deleted,
+        "incremental": bool(previous),
+    }
+
+    if not changed and not deleted:
+        yield summary
+        return
+
+    writer = PartWriter(output_prefix, part_size)
+    finished = False
+    try:
+        with zipfile.ZipFile(writer, 'w', zipfile.ZIP_DEFLATED) as zipf:
+            for path, arcname in changed:
+                info = zipfile.ZipInfo.from_file(path, arcname)
+                info.compress_type = get_compress_type(arcname)
+                digest = hashlib.sha256()
+                with open(path, 'rb') as source, zipf.open(info, 'w') as target:
+                    for chunk in iter(lambda: source.read(COPY_CHUNK_SIZE), b""):
+                        digest.update(chunk)
+                        target.write(chunk)
+                        for part in writer.take_completed():
+                            yield {"part": part}
+                files[arcname]["sha256"] = digest.hexdigest()
+
+            zipf.writestr(ARCHIVE_MANIFEST_NAME, json.dumps({
+                "created_at": manifest["created_at"],
+                "incremental_since": previous.get("created_at"),
+                "files": files,
+                "included": [arcname for _, arcname in changed],
+                "deleted": deleted,
+            }, indent=1))
+        parts = writer.close()
+        finished = True
+    finally:
+        if not finished:
+            writer.current.close()
+            writer.remove_unsent()
+
+    for part in parts:
+        yield {"part": part}
+
+    yield summary
@@ -0,0 +1,187 @@
+import asyncio
+import json
+import os
+import tempfile
+import time
+from telegram import InlineKeyboardButton, InlineKeyboardMarkup
+from telegram.error import RetryAfter, Forbidden, BadRequest
+from config import (
+    DATA_DIR, BROADCAST_RATE, BROADCAST_CONCURRENCY, BROADCAST_PROGRESS_INTERVAL
+)
+from utils.user_manager import iter_user_ids, get_total_users
+from utils.api_scheduler import TokenBucket, retry_after_seconds, PRIORITY_BULK
+
+BROADCAST_STATE_FILE = os.path.join(DATA_DIR, "broadcast.json")
+BATCH_SIZE = 200
+MAX_ATTEMPTS = 3
+
+_task = None
+_stop_requested = False
+
+def _load_state():
+    if not os.path.exists(BROADCAST_STATE_FILE):
+        return None
+    try:
+        with open(BROADCAST_STATE_FILE, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (json.JSONDecodeError, FileNotFoundError):
+        return None
+
+def _save_state(job):
+    fd, tmp_path = tempfile.mkstemp(dir=DATA_DIR, prefix=".broadcast-", suffix=".tmp")
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(job, f, ensure_ascii=False)
+        os.replace(tmp_path, BROADCAST_STATE_FILE)
+    except Exception:
+        os.remove(tmp_path)
+        raise
+
+def _clear_state():
+    if os.path.exists(BROADCAST_STATE_FILE):
+        os.remove(BROADCAST_STATE_FILE)
+
+def new_broadcast_job(admin_chat_id, progress_message_id, text=None, from_chat_id=None, message_id=None):
+    return {
+        "mode": "text" if text is not None else "copy",
+        "text": text,
+        "from_chat_id": from_chat_id,
+        "message_id": message_id,
+        "admin_chat_id": admin_chat_id,
+        "progress_message_id": progress_message_id,
+        "cursor": None,
+        "sent": 0,
+        "failed": 0,
+        "started_at": time.time()
+    }
+
+def is_broadcast_running():
+    return _task is not None and not _task.done()
+
+def start_broadcast(application, job):
+    global _task, _stop_requested
+    _stop_requested = False
+    _save_state(job)
+    _task = application.create_task(_run_broadcast(application.bot, job))
+    return _task
+
+def stop_broadcast():
+    global _stop_requested
+    if not is_broadcast_running():
+        return False
+    _stop_requested = True
+    return True
+
+async def resume_broadcast(application):
+    job = _load_state()
+    if job and not is_broadcast_running():
+        print(f"Resuming broadcast after user {job['cursor']}")
+        start_broadcast(application, job)
+
+async def _send_one(bot, job, chat_id, bucket):
+    for _ in range(MAX_ATTEMPTS):
+        await bucket.acquire()
+        try:
+            if job["mode"] == "copy":
+                await bot.copy_message(
+                    chat_id=chat_id,
+                    from_chat_id=job["from_chat_id"],
+                    message_id=job["message_id"],
+                    rate_limit_args={"priority": PRIORITY_BULK}
+                )
+            else:
+                await bot.send_message(
+                    chat_id=chat_id, text=job["text"], rate_limit_args={"priority": PRIORITY_BULK}
+                )
+            return True
+        except RetryAfter as e:
+            bucket.pause(retry_after_seconds(e))
+        except (Forbidden, BadRequest):
+            return False
+        except Exception as e:
+            print(f"Broadcast to {chat_id} failed: {e}")
+            return False
+    return False
+
+async def _send_batch(bot, job, batch, bucket):
+    semaphore = asyncio.Semaphore(BROADCAST_CONCURRENCY)
+    
+    async def send(chat_id):
+        async with semaphore:
+            return await _send_one(bot, job, chat_id, bucket)
+    
+    results = await asyncio.gather(*(send(chat_id) for chat_id in batch))
+    sent = sum(1 for ok in results if ok)
+    job["sent"] += sent
+    job["failed"] += len(results) - sent
+    job["cursor"] = batch[-1]
+    _save_state(job)
+
+def _progress_text(job, total, rate, finished=False, stopped=False):
+    if stopped:
+        title = "⏹ <b>Broadcast stopped</b>"
+    elif finished:
+        title = "✅ <b>Broadcast complete!</b>"
+    else:
+        title = "📢 <b>Broadcasting message...</b>"
+    done = job["sent"] + job["failed"]
+    return (
+        f"{title}\n\n"
+        f"👥 Progress: <b>{done}/{total}</b>\n"
+        f"📤 Sent: <b>{job['sent']}</b>\n"
+        f"❌ Failed: <b>{job['failed']}</b>\n"
+        f"⚡ Rate: <b>{rate:.1f}</b> msg/s"
+    )
+
+async def _report_progress(bot, job, total, rate, finished=False, stopped=False):
+    reply_markup = None
+    if not finished:
+        reply_markup = InlineKeyboardMarkup(
+            [[InlineKeyboardButton("⏹ Stop", callback_data="users_broadcast_stop")]]
+        )
+    try:
+        await bot.edit_message_text(
+            chat_id=job["admin_chat_id"],
+            message_id=job["progress_message_id"],
+            text=_progress_text(job, total, rate, finished, stopped),
+            parse_mode="HTML",
+            reply_markup=reply_markup
+        )
+    except Exception as e:
+        print(f"Failed to update broadcast progress: {e}")
+
+async def _run_broadcast(bot, job):
+    bucket = TokenBucket(BROADCAST_RATE)
+    total = get_total_users()
+    run_started = time.monotonic()
+    run_done = 0
+    last_report = run_started
+    batch = []
+    
+    def rate():
+        return run_done / max(time.monotonic() - run_started, 0.001)
+    
+    try:
+        for chat_id in iter_user_ids(after_id=job["cursor"]):
+            batch.append(chat_id)
+            if len(batch) < BATCH_SIZE:
+                continue
+            
+            await _send_batch(bot, job, batch, bucket)
+            run_done += len(batch)
+            batch = []
+            
+            if _stop_requested:
+                break
+            if time.monotonic() - last_report >= BROADCAST_PROGRESS_INTERVAL:
+                last_report = time.monotonic()
+                await _report_progress(bot, job, total, rate())
+        
+        if batch and not _stop_requested:
+            await _send_batch(bot, job, batch, bucket)
+            run_done += len(batch)
+        
+        _clear_state()
+        await _report_progress(bot, job, total, rate(), finished=True, stopped=_stop_requested)
+    except Exception as e:
+        print(f"Broadcast interrupted: {e}")
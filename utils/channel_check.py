@@ -1,48 +1,77 @@
+import asyncio
+import time
 from telegram import ChatMember
+from config import MEMBERSHIP_CACHE_TTL, MEMBERSHIP_NEGATIVE_TTL
 from utils.settings_manager import get_channels
+from utils.metrics import cache_requests_total
 
-async def is_user_member(bot, user_id):
-    channels = get_channels()
-    required_channels = [ch for ch in channels if ch.get("required", True)]
+MEMBER_STATUSES = [
+    ChatMember.MEMBER,
+    ChatMember.ADMINISTRATOR,
+    ChatMember.OWNER
+]
+MAX_CACHED_USERS = 10000
+
+# user_id -> {channel username (lowercase): (is_member, expires_at)}
+_membership_cache = {}
+
+def invalidate_membership_cache(user_id=None):
+    if user_id is None:
+        _membership_cache.clear()
+    else:
+        _membership_cache.pop(user_id, None)
+
+def _prune_cache(now):
+    for user_id in list(_membership_cache):
+        entries = _membership_cache[user_id]
+        if all(expires_at <= now for _, expires_at in entries.values()):
+            del _membership_cache[user_id]
+
+async def _check_channel(bot, user_id, channel):
+    key = channel["username"].lower()
+    now = time.monotonic()
+    cached = _membership_cache.get(user_id, {}).get(key)
+    if cached and cached[1] > now:
+        cache_requests_total.inc("membership", "hit")
+        return cached[0]
+    cache_requests_total.inc("membership", "miss")
     
-    if not required_channels:
-        return True
+    try:
+        member = await bot.get_chat_member(
+            chat_id=f"@{channel['username']}", 
+            user_id=user_id
+        )
+    except Exception:
+        # Unknown: not cached, callers decide how to treat it.
+        return None
     
-    for channel in required_channels:
-        try:
-            member = await bot.get_chat_member(
-                chat_id=f"@{channel['username']}", 
-                user_id=user_id
-            )
-            if member.status not in [
-                ChatMember.MEMBER,
-                ChatMember.ADMINISTRATOR,
-                ChatMember.OWNER
-            ]:
-                return False
-        except Exception:
-            continue
+    is_member = member.status in MEMBER_STATUSES
+    ttl = MEMBERSHIP_CACHE_TTL if is_member else MEMBERSHIP_NEGATIVE_TTL
     
-    return True
+    if len(_membership_cache) >= MAX_CACHED_USERS and user_id not in _membership_cache:
+        _prune_cache(now)
+    _membership_cache.setdefault(user_id, {})[key] = (is_member, now + ttl)
+    return is_member
 
-async def get_missing_channels(bot, user_id):
+async def _check_required_channels(bot, user_id):
     channels = get_channels()
     required_channels = [ch for ch in channels if ch.get("required", True)]
-    missing = []
     
-    for channel in required_channels:
-        try:
-            member = await bot.get_chat_member(
-                chat_id=f"@{channel['username']}", 
-                user_id=user_id
-            )
-            if member.status not in [
-                ChatMember.MEMBER,
-                ChatMember.ADMINISTRATOR,
-                ChatMember.OWNER
-            ]:
-                missing.append(channel)
-        except Exception:
-            missing.append(channel)
+    results = await asyncio.gather(
+        *(_check_channel(bot, user_id, channel) for channel in required_channels)
+    )
+    return list(zip(required_channels, results))
+
+async def is_user_member(bot, user_id):
+    for channel, is_member in await _check_required_channels(bot, user_id):
+        if is_member is False:
+            return False
     
-    return missing
+    return True
+
+async def get_missing_channels(bot, user_id):
+    return [
+        channel
+        for channel, is_member in await _check_required_channels(bot, user_id)
+        if not is_member
+    ]
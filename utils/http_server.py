@@ -0,0 +1,103 @@
+import asyncio
+import hashlib
+import hmac
+import json
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from telegram import Update
+from utils.metrics import Counter, render_metrics, is_ready
+
+MAX_UPDATE_BYTES = 1024 * 1024
+SECRET_HEADER = "X-Telegram-Bot-Api-Secret-Token"
+
+webhook_requests_total = Counter("unzipbot_webhook_requests_total", "Webhook POSTs by outcome", ["result"])
+
+# Set by enable_webhook(); the server answers POSTs only once it is set.
+_webhook = None
+
+def get_webhook_secret(secret, bot_token):
+    # Telegram only allows A-Z, a-z, 0-9, _ and - in the secret. Deriving it
+    # from the token keeps it stable across restarts when none is configured.
+    return secret or hashlib.sha256(f"webhook:{bot_token}".encode()).hexdigest()
+
+def enable_webhook(application, loop, path, secret):
+    global _webhook
+    _webhook = {"application": application, "loop": loop, "path": path, "secret": secret}
+
+def disable_webhook():
+    global _webhook
+    _webhook = None
+
+# Serves the Koyeb health check, Prometheus and (in webhook mode) Telegram
+# updates from one port. "/" stays a plain liveness check; "/ready" only
+# succeeds once the bot is receiving updates.
+class HealthHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        path = self.path.split("?", 1)[0]
+        if path == "/metrics":
+            self._reply(200, render_metrics().encode(), "text/plain; version=0.0.4; charset=utf-8")
+        elif path == "/ready":
+            if is_ready():
+                self._reply(200, b"READY")
+            else:
+                self._reply(503, b"NOT READY")
+        else:
+            self._reply(200, b"OK")
+
+    def do_POST(self):
+        webhook = _webhook
+        if webhook is None or self.path.split("?", 1)[0] != webhook["path"]:
+            self._reply(404, b"Not Found")
+            return
+
+        token = self.headers.get(SECRET_HEADER, "")
+        if not hmac.compare_digest(token.encode(), webhook["secret"].encode()):
+            webhook_requests_total.inc("forbidden")
+            self._reply(403, b"Forbidden")
+            return
+
+        length = int(self.headers.get("Content-Length") or 0)
+        if length <= 0 or length > MAX_UPDATE_BYTES:
+            webhook_requests_total.inc("invalid")
+            self._reply(413 if length else 400, b"Bad Request")
+            return
+
+        application = webhook["application"]
+        try:
+            update = Update.de_json(json.loads(self.rfile.read(length)), application.bot)
+        except Exception as e:
+            print(f"Invalid webhook update: {e}")
+            webhook_requests_total.inc("invalid")
+            self._reply(400, b"Bad Request")
+            return
+
+        # Hand the update to the application's own queue on the event loop;
+        # Telegram gets its 200 straight away and processing happens there.
+        webhook["loop"].call_soon_threadsafe(application.update_queue.put_nowait, update)
+        webhook_requests_total.inc("accepted")
+        self._reply(200, b"OK")
+
+    def _reply(self, status, body, content_type="text/plain"):
+        self.send_response(status)
+        self.send_header("Content-type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        # Scrapes, health probes and webhook calls would flood the log.
+        pass
+
+def start_http_server(port):
+    server = ThreadingHTTPServer(("0.0.0.0", port), HealthHandler)
+    server.daemon_threads = True
+    server.serve_forever()
+
+async def setup_webhook(application, url, path, secret, drop_pending_updates):
+    # Telegram keeps undelivered updates while we are down and re-sends them
+    # once the webhook answers again, unless drop_pending_updates is set.
+    enable_webhook(application, asyncio.get_running_loop(), path, secret)
+    await application.bot.set_webhook(
+        url=url.rstrip("/") + path,
+        secret_token=secret,
+        drop_pending_updates=drop_pending_updates,
+    )
@@ -0,0 +1,179 @@
+import asyncio
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from config import ADMIN_ID, JOB_SLOTS, USER_MAX_CONCURRENT_JOBS, USER_HOURLY_QUOTA_MB
+
+QUOTA_WINDOW = 3600
+
+class QuotaExceededError(Exception):
+    pass
+
+# Admits ZIP jobs into JOB_SLOTS running slots. Waiting users are served
+# round-robin (one job per user per round) so a user with many archives
+# cannot starve others; the admin's jobs always go first.
+class JobScheduler:
+    def __init__(self, slots, per_user_limit, hourly_quota_bytes, admin_id=None):
+        self.slots = slots
+        self.per_user_limit = per_user_limit
+        self.hourly_quota_bytes = hourly_quota_bytes
+        self.admin_id = admin_id
+        self.running = {}
+        self.total_running = 0
+        self.waiting = {}
+        self.turns = deque()
+        self.usage = {}
+        # user_id -> bytes of admitted jobs that have not been charged yet
+        self.reserved = {}
+
+    def queue_depth(self):
+        return sum(len(waiters) for waiters in self.waiting.values())
+
+    def running_jobs(self):
+        return self.total_running
+
+    def _check_quota(self, user_id, size):
+        if user_id == self.admin_id or not self.hourly_quota_bytes:
+            return
+        now = time.monotonic()
+        history = self.usage.setdefault(user_id, deque())
+        while history and history[0][0] <= now - QUOTA_WINDOW:
+            history.popleft()
+        
+        used = sum(size for _, size in history) + self.reserved.get(user_id, 0)
+        if used + size > self.hourly_quota_bytes:
+            wait_minutes = int((history[0][0] + QUOTA_WINDOW - now) / 60) + 1 if history else 60
+            raise QuotaExceededError(
+                f"Hourly limit of {self.hourly_quota_bytes // (1024 * 1024)}MB reached. "
+                f"Try again in about {wait_minutes} min."
+            )
+
+    def _reserve(self, user_id, size):
+        self.reserved[user_id] = self.reserved.get(user_id, 0) + size
+
+    def _unreserve(self, user_id, size):
+        self.reserved[user_id] -= size
+        if not self.reserved[user_id]:
+            del self.reserved[user_id]
+
+    def _charge(self, user_id, size):
+        if user_id == self.admin_id or not self.hourly_quota_bytes:
+            return
+        self.usage.setdefault(user_id, deque()).append((time.monotonic(), size))
+
+    def _can_run(self, user_id):
+        return user_id == self.admin_id or self.running.get(user_id, 0) < self.per_user_limit
+
+    def _dispatch_order(self):
+        # Projected start order of all waiting jobs: admin first, then one
+        # job per user per round in turn order.
+        order = []
+        if self.admin_id in self.waiting:
+            order.extend(self.waiting[self.admin_id])
+        queues = [list(self.waiting[user_id]) for user_id in self.turns if user_id != self.admin_id]
+        depth = 0
+        while queues:
+            queues = [queue for queue in queues if len(queue) > depth]
+            order.extend(queue[depth] for queue in queues)
+            depth += 1
+        return order
+
+    def _start(self, user_id):
+        waiter = self.waiting[user_id].popleft()
+        if not self.waiting[user_id]:
+            del self.waiting[user_id]
+            if user_id in self.turns:
+                self.turns.remove(user_id)
+        else:
+            self.turns.remove(user_id)
+            self.turns.append(user_id)
+        self.running[user_id] = self.running.get(user_id, 0) + 1
+        self.total_running += 1
+        waiter["future"].set_result(None)
+
+    def _dispatch(self):
+        while self.total_running < self.slots:
+            if self.admin_id in self.waiting:
+                self._start(self.admin_id)
+                continue
+            user_id = next((u for u in self.turns if self._can_run(u)), None)
+            if user_id is None:
+                break
+            self._start(user_id)
+        self._notify_positions()
+
+    def _notify_positions(self):
+        for position, waiter in enumerate(self._dispatch_order(), 1):
+            if waiter["position"] != position and waiter["on_queued"]:
+                waiter["position"] = position
+                asyncio.ensure_future(waiter["on_queued"](position))
+
+    def _finish(self, user_id):
+        self.running[user_id] -= 1
+        if not self.running[user_id]:
+            del self.running[user_id]
+        self.total_running -= 1
+        self._dispatch()
+
+    # The quota is checked at admission, counting the user's other admitted
+    # jobs, but only charged when the job calls job["charge"]() once it has
+    # actually run; a job that is refused or fails early costs nothing.
+    @asynccontextmanager
+    async def job(self, user_id, size, on_queued=None):
+        self._check_quota(user_id, size)
+        self._reserve(user_id, size)
+        charged = False
+
+        def charge():
+            nonlocal charged
+            if not charged:
+                charged = True
+                self._unreserve(user_id, size)
+                self._charge(user_id, size)
+
+        try:
+            async with self._run_job(user_id, on_queued) as job:
+                job["charge"] = charge
+                yield job
+        finally:
+            if not charged:
+                self._unreserve(user_id, size)
+
+    @asynccontextmanager
+    async def _run_job(self, user_id, on_queued):
+        waiter = {
+            "future": asyncio.get_running_loop().create_future(),
+            "position": None,
+            "on_queued": on_queued
+        }
+        self.waiting.setdefault(user_id, deque()).append(waiter)
+        if user_id != self.admin_id and user_id not in self.turns:
+            self.turns.append(user_id)
+        self._dispatch()
+        
+        job = {"queued": not waiter["future"].done()}
+        try:
+            await waiter["future"]
+        except asyncio.CancelledError:
+            if waiter["future"].done():
+                self._finish(user_id)
+            else:
+                self.waiting[user_id].remove(waiter)
+                if not self.waiting[user_id]:
+                    del self.waiting[user_id]
+                    if user_id in self.turns:
+                        self.turns.remove(user_id)
+                self._notify_positions()
+            raise
+        
+        try:
+            yield job
+        finally:
+            self._finish(user_id)
+
+job_scheduler = JobScheduler(
+    JOB_SLOTS,
+    USER_MAX_CONCURRENT_JOBS,
+    USER_HOURLY_QUOTA_MB * 1024 * 1024,
+    ADMIN_ID
+)
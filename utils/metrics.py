@@ -0,0 +1,156 @@
+import bisect
+import time
+from telegram.request import HTTPXRequest
+
+# Minimal Prometheus collectors. Updates happen on the event loop (or under
+# the GIL from worker threads) without locks; the health server thread only
+# takes shallow copies when rendering, which is safe because dict copies are
+# atomic under the GIL.
+
+_collectors = []
+_ready = False
+
+DURATION_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+API_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+ENTRY_BUCKETS = (1, 5, 10, 25, 50, 100, 250, 1000)
+
+def _format_labels(names, values, extra=None):
+    pairs = list(zip(names, values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ""
+    escaped = (
+        (name, str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+        for name, value in pairs
+    )
+    return "{" + ",".join(f'{name}="{value}"' for name, value in escaped) + "}"
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+class Counter:
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.values = {}
+        _collectors.append(self)
+
+    def inc(self, *labels, amount=1):
+        self.values[labels] = self.values.get(labels, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        for labels, value in sorted(dict(self.values).items()):
+            lines.append(f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}")
+        return lines
+
+class Gauge:
+    # Read from a callback at scrape time, so nothing is tracked on the hot path.
+    def __init__(self, name, documentation, callback):
+        self.name = name
+        self.documentation = documentation
+        self.callback = callback
+        _collectors.append(self)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} gauge"]
+        try:
+            lines.append(f"{self.name} {_format_value(self.callback())}")
+        except Exception as e:
+            print(f"Metrics gauge {self.name} failed: {e}")
+        return lines
+
+class Histogram:
+    def __init__(self, name, documentation, labelnames=(), buckets=DURATION_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        # labels -> [per-bucket counts (last one is +Inf), sum, count]
+        self.values = {}
+        _collectors.append(self)
+
+    def observe(self, value, *labels):
+        state = self.values.get(labels)
+        if state is None:
+            state = self.values[labels] = [[0] * (len(self.buckets) + 1), 0, 0]
+        state[0][bisect.bisect_left(self.buckets, value)] += 1
+        state[1] += value
+        state[2] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        for labels, (counts, total, count) in sorted(dict(self.values).items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), list(counts)):
+                cumulative += bucket_count
+                label_text = _format_labels(self.labelnames, labels, ("le", _format_value(float(bound))))
+                lines.append(f"{self.name}_bucket{label_text} {cumulative}")
+            label_text = _format_labels(self.labelnames, labels)
+            lines.append(f"{self.name}_sum{label_text} {_format_value(float(total))}")
+            lines.append(f"{self.name}_count{label_text} {count}")
+        return lines
+
+class Timer:
+    # with Timer(histogram, "label"): ... observes the elapsed seconds.
+    def __init__(self, histogram, *labels):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.histogram.observe(time.perf_counter() - self.start, *self.labels)
+        return False
+
+def render_metrics():
+    lines = []
+    for collector in list(_collectors):
+        lines.extend(collector.render())
+    return "\n".join(lines) + "\n"
+
+def set_ready(ready):
+    global _ready
+    _ready = ready
+
+def is_ready():
+    return _ready
+
+updates_total = Counter("unzipbot_updates_total", "Updates handled", ["type"])
+update_duration = Histogram("unzipbot_update_duration_seconds", "Time spent handling an update", ["type"])
+job_stage_duration = Histogram("unzipbot_job_stage_duration_seconds", "Time spent per archive job stage", ["stage"])
+jobs_total = Counter("unzipbot_jobs_total", "Archive jobs by outcome", ["result"])
+bytes_total = Counter("unzipbot_bytes_total", "Archive bytes downloaded and file bytes uploaded", ["direction"])
+archive_entries = Histogram("unzipbot_archive_entries", "Files extracted per archive", buckets=ENTRY_BUCKETS)
+api_requests_total = Counter("unzipbot_api_requests_total", "Bot API requests", ["method"])
+api_errors_total = Counter("unzipbot_api_errors_total", "Failed Bot API requests", ["method", "error"])
+api_duration = Histogram("unzipbot_api_request_duration_seconds", "Bot API request latency", ["method"], API_BUCKETS)
+cache_requests_total = Counter("unzipbot_cache_requests_total", "Cache lookups", ["cache", "result"])
+
+# Counts every Bot API call by method. File downloads go through retrieve()
+# and are reported as "downloadFile".
+class MetricsRequest(HTTPXRequest):
+    async def post(self, url, *args, **kwargs):
+        return await self._measure(url.rsplit("/", 1)[-1], super().post(url, *args, **kwargs))
+
+    async def retrieve(self, url, *args, **kwargs):
+        return await self._measure("downloadFile", super().retrieve(url, *args, **kwargs))
+
+    async def _measure(self, method, coroutine):
+        api_requests_total.inc(method)
+        start = time.perf_counter()
+        try:
+            return await coroutine
+        except Exception as e:
+            api_errors_total.inc(method, type(e).__name__)
+            raise
+        finally:
+            api_duration.observe(time.perf_counter() - start, method)
@@ -0,0 +1,117 @@
+import sqlite3
+import threading
+import time
+from config import (
+    RESULT_CACHE_DB, RESULT_CACHE_MAX_ARCHIVES, RESULT_CACHE_MAX_AGE_DAYS, NESTED_EXTRACT_DEPTH,
+    SPLIT_LARGE_FILES, SPLIT_PART_MB
+)
+from utils.zip_handler import MAX_FILES, MAX_TOTAL_SIZE, MAX_SINGLE_FILE_SIZE
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS archives (
+    key TEXT PRIMARY KEY,
+    total_files INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    last_used_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS archives_last_used_at ON archives (last_used_at);
+
+CREATE TABLE IF NOT EXISTS entries (
+    key TEXT NOT NULL REFERENCES archives (key) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    type TEXT NOT NULL,
+    kind TEXT,
+    file_id TEXT,
+    split_from TEXT,
+    PRIMARY KEY (key, position)
+);
+"""
+
+_conn = None
+_lock = threading.RLock()
+
+def _connect():
+    global _conn
+    if _conn is None:
+        conn = sqlite3.connect(RESULT_CACHE_DB, check_same_thread=False, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA foreign_keys=ON")
+        conn.executescript(SCHEMA)
+        columns = [row["name"] for row in conn.execute("PRAGMA table_info(entries)")]
+        if "split_from" not in columns:
+            conn.execute("ALTER TABLE entries ADD COLUMN split_from TEXT")
+        _conn = conn
+    return _conn
+
+def get_cache_key(file_unique_id):
+    # The same archive extracted under different limits gives a different result.
+    split = SPLIT_PART_MB if SPLIT_LARGE_FILES else 0
+    return f"{file_unique_id}:{MAX_FILES}:{MAX_TOTAL_SIZE}:{MAX_SINGLE_FILE_SIZE}:{NESTED_EXTRACT_DEPTH}:{split}"
+
+def get_cached_result(key):
+    with _lock:
+        conn = _connect()
+        row = conn.execute(
+            "SELECT total_files, created_at FROM archives WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        if row["created_at"] < time.time() - RESULT_CACHE_MAX_AGE_DAYS * 86400:
+            invalidate_result(key)
+            return None
+        
+        entries = conn.execute(
+            "SELECT name, type, kind, file_id, split_from FROM entries WHERE key = ? ORDER BY position", (key,)
+        ).fetchall()
+        conn.execute("UPDATE archives SET last_used_at = ? WHERE key = ?", (time.time(), key))
+    
+    if len(entries) != row["total_files"]:
+        return None
+    return {
+        "total_files": row["total_files"],
+        "entries": [dict(entry) for entry in entries]
+    }
+
+def store_result(key, entries):
+    now = time.time()
+    with _lock:
+        conn = _connect()
+        with conn:
+            conn.execute("BEGIN")
+            conn.execute("DELETE FROM archives WHERE key = ?", (key,))
+            conn.execute(
+                "INSERT INTO archives (key, total_files, created_at, last_used_at) VALUES (?, ?, ?, ?)",
+                (key, len(entries), now, now)
+            )
+            conn.executemany(
+                "INSERT INTO entries (key, position, name, type, kind, file_id, split_from) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (
+                    (
+                        key, position, entry["name"], entry["type"],
+                        entry.get("kind"), entry.get("file_id"), entry.get("split_from")
+                    )
+                    for position, entry in enumerate(entries)
+                )
+            )
+        _evict(conn, now)
+
+def invalidate_result(key):
+    with _lock:
+        _connect().execute("DELETE FROM archives WHERE key = ?", (key,))
+
+def _evict(conn, now):
+    with conn:
+        conn.execute("BEGIN")
+        conn.execute(
+            "DELETE FROM archives WHERE created_at < ?",
+            (now - RESULT_CACHE_MAX_AGE_DAYS * 86400,)
+        )
+        conn.execute(
+            "DELETE FROM archives WHERE key IN ("
+            "SELECT key FROM archives ORDER BY last_used_at DESC LIMIT -1 OFFSET ?)",
+            (RESULT_CACHE_MAX_ARCHIVES,)
+        )
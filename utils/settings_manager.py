@@ -1,6 +1,10 @@
+import atexit
+import copy
 import json
 import os
-from config import DATA_DIR
+import tempfile
+import threading
+from config import DATA_DIR, SETTINGS_FLUSH_DELAY
 
 SETTINGS_FILE = os.path.join(DATA_DIR, "settings.json")
 
@@ -15,95 +19,159 @@ DEFAULT_SETTINGS = {
     "maintenance_mode": False
 }
 
-def load_settings():
+# Settings are cached in memory and only re-read when settings.json changes
+# on disk. Mutations update the cache and are written back after
+# SETTINGS_FLUSH_DELAY seconds, so a burst of changes costs a single write.
+_lock = threading.RLock()
+_settings = None
+_mtime = None
+_dirty = False
+_flush_timer = None
+
+def _file_mtime():
+    try:
+        return os.stat(SETTINGS_FILE).st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+def _read_settings_file():
     if os.path.exists(SETTINGS_FILE):
         try:
             with open(SETTINGS_FILE, 'r', encoding='utf-8') as f:
                 settings = json.load(f)
                 for key, value in DEFAULT_SETTINGS.items():
                     if key not in settings:
-                        settings[key] = value
+                        settings[key] = copy.deepcopy(value)
                 return settings
         except (json.JSONDecodeError, FileNotFoundError):
-            return DEFAULT_SETTINGS.copy()
-    return DEFAULT_SETTINGS.copy()
+            return copy.deepcopy(DEFAULT_SETTINGS)
+    return copy.deepcopy(DEFAULT_SETTINGS)
+
+def _get_cached():
+    global _settings, _mtime
+    with _lock:
+        if _dirty:
+            return _settings
+        mtime = _file_mtime()
+        if _settings is None or mtime != _mtime:
+            _settings = _read_settings_file()
+            _mtime = mtime
+        return _settings
+
+def _schedule_flush():
+    global _dirty, _flush_timer
+    _dirty = True
+    if _flush_timer is None:
+        _flush_timer = threading.Timer(SETTINGS_FLUSH_DELAY, flush_settings)
+        _flush_timer.daemon = True
+        _flush_timer.start()
+
+def flush_settings():
+    global _dirty, _flush_timer, _mtime
+    with _lock:
+        if _flush_timer is not None:
+            _flush_timer.cancel()
+            _flush_timer = None
+        if not _dirty:
+            return
+        
+        os.makedirs(DATA_DIR, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=DATA_DIR, prefix=".settings-", suffix=".tmp")
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(_settings, f, indent=2, ensure_ascii=False)
+            os.replace(tmp_path, SETTINGS_FILE)
+        except Exception:
+            os.remove(tmp_path)
+            raise
+        
+        _mtime = _file_mtime()
+        _dirty = False
+
+atexit.register(flush_settings)
+
+def load_settings():
+    with _lock:
+        return copy.deepcopy(_get_cached())
 
 def save_settings(settings):
-    os.makedirs(DATA_DIR, exist_ok=True)
-    with open(SETTINGS_FILE, 'w', encoding='utf-8') as f:
-        json.dump(settings, f, indent=2, ensure_ascii=False)
+    global _settings
+    with _lock:
+        _settings = copy.deepcopy(settings)
+        _schedule_flush()
 
 def get_channels():
-    settings = load_settings()
-    return settings.get("channels", [])
+    with _lock:
+        return [dict(ch) for ch in _get_cached().get("channels", [])]
 
 def add_channel(username, title=""):
     username = username.replace("@", "").replace("https://t.me/", "").strip()
     if not username:
         return False, "Invalid channel username"
     
-    settings = load_settings()
-    channels = settings.get("channels", [])
-    
-    for ch in channels:
-        if ch["username"].lower() == username.lower():
-            return False, "Channel already exists"
-    
-    channels.append({
-        "username": username,
-        "title": title or username,
-        "required": True
-    })
-    
-    settings["channels"] = channels
-    save_settings(settings)
+    with _lock:
+        settings = _get_cached()
+        channels = settings.setdefault("channels", [])
+        
+        for ch in channels:
+            if ch["username"].lower() == username.lower():
+                return False, "Channel already exists"
+        
+        channels.append({
+            "username": username,
+            "title": title or username,
+            "required": True
+        })
+        
+        _schedule_flush()
     return True, f"Channel @{username} added successfully"
 
 def remove_channel(username):
     username = username.replace("@", "").strip()
-    settings = load_settings()
-    channels = settings.get("channels", [])
-    
-    original_count = len(channels)
-    channels = [ch for ch in channels if ch["username"].lower() != username.lower()]
-    
-    if len(channels) == original_count:
-        return False, "Channel not found"
-    
-    settings["channels"] = channels
-    save_settings(settings)
+    with _lock:
+        settings = _get_cached()
+        channels = settings.get("channels", [])
+        
+        original_count = len(channels)
+        channels = [ch for ch in channels if ch["username"].lower() != username.lower()]
+        
+        if len(channels) == original_count:
+            return False, "Channel not found"
+        
+        settings["channels"] = channels
+        _schedule_flush()
     return True, f"Channel @{username} removed"
 
 def toggle_channel(username):
     username = username.replace("@", "").strip()
-    settings = load_settings()
-    channels = settings.get("channels", [])
-    
-    for ch in channels:
-        if ch["username"].lower() == username.lower():
-            ch["required"] = not ch["required"]
-            settings["channels"] = channels
-            save_settings(settings)
-            status = "enabled" if ch["required"] else "disabled"
-            return True, f"Channel @{username} {status}"
+    with _lock:
+        settings = _get_cached()
+        
+        for ch in settings.get("channels", []):
+            if ch["username"].lower() == username.lower():
+                ch["required"] = not ch["required"]
+                _schedule_flush()
+                status = "enabled" if ch["required"] else "disabled"
+                return True, f"Channel @{username} {status}"
     
     return False, "Channel not found"
 
 def get_setting(key):
-    settings = load_settings()
-    return settings.get(key, DEFAULT_SETTINGS.get(key))
+    with _lock:
+        return copy.deepcopy(_get_cached().get(key, DEFAULT_SETTINGS.get(key)))
 
 def set_setting(key, value):
-    settings = load_settings()
-    settings[key] = value
-    save_settings(settings)
+    with _lock:
+        _get_cached()[key] = copy.deepcopy(value)
+        _schedule_flush()
     return True
 
 def toggle_maintenance():
-    settings = load_settings()
-    settings["maintenance_mode"] = not settings.get("maintenance_mode", False)
-    save_settings(settings)
-    return settings["maintenance_mode"]
+    with _lock:
+        settings = _get_cached()
+        settings["maintenance_mode"] = not settings.get("maintenance_mode", False)
+        _schedule_flush()
+        return settings["maintenance_mode"]
 
 def is_maintenance_mode():
     return get_setting("maintenance_mode")
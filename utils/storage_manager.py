@@ -0,0 +1,178 @@
+import asyncio
+import os
+import shutil
+import threading
+import time
+from config import (
+    EXTRACTED_DIR, EXTRACTED_QUOTA_MB, DISK_MIN_FREE_MB, EXTRACTED_TTL_MINUTES,
+    MEMORY_JOB_MAX_MB, MEMORY_GLOBAL_MAX_MB
+)
+from utils.zip_handler import get_extract_dir
+
+JANITOR_INTERVAL = 300
+STATS_TOP_USERS = 5
+
+# job_dir -> {"user_id", "bytes", "active", "last_used"}
+_jobs = {}
+
+# Bytes of archives and entries currently held in memory by all jobs.
+_memory_used = 0
+_memory_lock = threading.Lock()
+
+class StorageFullError(Exception):
+    pass
+
+# Lets one job keep small downloads and extracted entries in memory instead
+# of on disk, within a per-job and a global budget. reserve() is called from
+# extraction threads, so the global counter is locked.
+class JobMemory:
+    def __init__(self, max_bytes=None):
+        self.max_bytes = MEMORY_JOB_MAX_MB * 1024 * 1024 if max_bytes is None else max_bytes
+        self.used = 0
+
+    def reserve(self, size):
+        global _memory_used
+        # The extraction thread reserves while the event loop releases what
+        # was uploaded, so the job's own count is guarded too.
+        with _memory_lock:
+            if self.used + size > self.max_bytes:
+                return False
+            if _memory_used + size > MEMORY_GLOBAL_MAX_MB * 1024 * 1024:
+                return False
+            _memory_used += size
+            self.used += size
+        return True
+
+    def release(self, size=None):
+        global _memory_used
+        with _memory_lock:
+            size = self.used if size is None else min(size, self.used)
+            _memory_used -= size
+            self.used -= size
+
+def get_memory_used():
+    return _memory_used
+
+def _free_bytes():
+    return shutil.disk_usage(EXTRACTED_DIR).free
+
+def _used_bytes():
+    return sum(job["bytes"] for job in _jobs.values())
+
+def _pop_inactive_lru():
+    inactive = [(job["last_used"], job_dir) for job_dir, job in _jobs.items() if not job["active"]]
+    if not inactive:
+        return None
+    _, job_dir = min(inactive)
+    del _jobs[job_dir]
+    return job_dir
+
+async def _remove_dirs(job_dirs):
+    for job_dir in job_dirs:
+        await asyncio.to_thread(shutil.rmtree, job_dir, True)
+
+async def ensure_capacity(incoming_bytes=0):
+    quota = EXTRACTED_QUOTA_MB * 1024 * 1024
+    watermark = DISK_MIN_FREE_MB * 1024 * 1024
+    
+    while _used_bytes() + incoming_bytes > quota or _free_bytes() - incoming_bytes < watermark:
+        job_dir = _pop_inactive_lru()
+        if job_dir is None:
+            raise StorageFullError("Server storage is full right now, please try again later")
+        await _remove_dirs([job_dir])
+
+def open_job(user_id):
+    job_dir = get_extract_dir(user_id)
+    _jobs[job_dir] = {
+        "user_id": user_id,
+        "bytes": 0,
+        "active": True,
+        "last_used": time.time()
+    }
+    return job_dir
+
+def add_job_bytes(job_dir, size):
+    job = _jobs.get(job_dir)
+    if job:
+        job["bytes"] += size
+        job["last_used"] = time.time()
+
+async def release_job(job_dir):
+    # Delivered files stay on disk until EXTRACTED_TTL_MINUTES passes or the
+    # quota needs the space, least recently used first. Folders with nothing
+    # on disk are removed right away.
+    job = _jobs.get(job_dir)
+    if job and job["bytes"]:
+        job["active"] = False
+        job["last_used"] = time.time()
+        return
+    _jobs.pop(job_dir, None)
+    await _remove_dirs([job_dir])
+
+def _dir_size(path):
+    total = 0
+    for root, dirs, files in os.walk(path):
+        for file in files:
+            try:
+                total += os.path.getsize(os.path.join(root, file))
+            except OSError:
+                pass
+    return total
+
+def register_existing_jobs():
+    # Folders left behind by a previous run count against the quota and are
+    # evicted like any other finished job.
+    for user_dir in os.scandir(EXTRACTED_DIR):
+        if not user_dir.is_dir():
+            continue
+        for job_entry in os.scandir(user_dir.path):
+            if job_entry.is_dir() and job_entry.path not in _jobs:
+                _jobs[job_entry.path] = {
+                    "user_id": user_dir.name,
+                    "bytes": _dir_size(job_entry.path),
+                    "active": False,
+                    "last_used": job_entry.stat().st_mtime
+                }
+
+async def sweep_expired():
+    cutoff = time.time() - EXTRACTED_TTL_MINUTES * 60
+    expired = [
+        job_dir for job_dir, job in _jobs.items()
+        if not job["active"] and job["last_used"] < cutoff
+    ]
+    for job_dir in expired:
+        del _jobs[job_dir]
+    await _remove_dirs(expired)
+    return len(expired)
+
+async def run_storage_janitor():
+    while True:
+        try:
+            removed = await sweep_expired()
+            if removed:
+                print(f"Storage janitor removed {removed} expired extraction folders")
+        except Exception as e:
+            print(f"Storage janitor failed: {e}")
+        await asyncio.sleep(JANITOR_INTERVAL)
+
+def get_usage_by_user(limit=None):
+    # [(user_id, bytes)], largest first.
+    usage = {}
+    for job in _jobs.values():
+        user_id = str(job["user_id"])
+        usage[user_id] = usage.get(user_id, 0) + job["bytes"]
+    return sorted(usage.items(), key=lambda item: item[1], reverse=True)[:limit]
+
+def get_storage_stats():
+    usage = shutil.disk_usage(EXTRACTED_DIR)
+    return {
+        "used_bytes": _used_bytes(),
+        "quota_bytes": EXTRACTED_QUOTA_MB * 1024 * 1024,
+        "active_jobs": len([job for job in _jobs.values() if job["active"]]),
+        "retained_jobs": len([job for job in _jobs.values() if not job["active"]]),
+        "users": len({str(job["user_id"]) for job in _jobs.values()}),
+        "top_users": get_usage_by_user(STATS_TOP_USERS),
+        "disk_free_bytes": usage.free,
+        "memory_bytes": _memory_used,
+        "disk_total_bytes": usage.total
+    }
@@ -0,0 +1,79 @@
+import asyncio
+from telegram import Update
+from telegram.ext import BaseUpdateProcessor
+from utils.metrics import Timer, update_duration, updates_total
+
+# Updates allowed to wait for their chat on top of the ones being processed.
+MAX_WAITING_UPDATES = 1000
+
+# Processes updates concurrently, but one at a time per chat so multi-step
+# flows (awaiting_channel, awaiting_broadcast...) still see messages in the
+# order they were sent. Documents are not ordered. The base class semaphore only bounds updates in
+# flight; the max_concurrent_updates slots are a separate semaphore taken
+# after the chat lock, so updates waiting for their chat do not hold one.
+class ChatOrderedUpdateProcessor(BaseUpdateProcessor):
+    def __init__(self, max_concurrent_updates):
+        super().__init__(max_concurrent_updates + MAX_WAITING_UPDATES)
+        self._slots = asyncio.BoundedSemaphore(max_concurrent_updates)
+        self._chat_locks = {}
+        self._chat_pending = {}
+
+    @staticmethod
+    def _get_key(update):
+        if not isinstance(update, Update):
+            return None
+        # An archive job runs for minutes (download, extraction, uploads);
+        # holding the chat for it would stall the user's buttons and replies,
+        # and the job scheduler orders a user's archives on its own.
+        if update.message and update.message.document:
+            return None
+        if update.effective_chat:
+            return update.effective_chat.id
+        if update.effective_user:
+            return update.effective_user.id
+        return None
+
+    async def _process_in_order(self, key, update, coroutine):
+        lock = self._chat_locks.get(key)
+        if lock is None:
+            lock = self._chat_locks[key] = asyncio.Lock()
+        self._chat_pending[key] = self._chat_pending.get(key, 0) + 1
+        try:
+            async with lock:
+                async with self._slots:
+                    await self._process(update, coroutine)
+        finally:
+            self._chat_pending[key] -= 1
+            if not self._chat_pending[key]:
+                del self._chat_pending[key]
+                del self._chat_locks[key]
+
+    @staticmethod
+    def _get_type(update):
+        if not isinstance(update, Update):
+            return "other"
+        if update.callback_query:
+            return "callback_query"
+        if update.message:
+            return "document" if update.message.document else "message"
+        return "other"
+
+    async def do_process_update(self, update, coroutine):
+        key = self._get_key(update)
+        if key is None:
+            async with self._slots:
+                await self._process(update, coroutine)
+        else:
+            await self._process_in_order(key, update, coroutine)
+
+    async def _process(self, update, coroutine):
+        update_type = self._get_type(update)
+        updates_total.inc(update_type)
+        with Timer(update_duration, update_type):
+            await coroutine
+
+    async def initialize(self):
+        pass
+
+    async def shutdown(self):
+        pass
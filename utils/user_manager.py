@@ -1,48 +1,170 @@
 import json
 import os
+import sqlite3
+import threading
 from datetime import datetime
-from config import USERS_FILE, DATA_DIR
+from config import USERS_FILE, USERS_DB, DATA_DIR
 
 os.makedirs(DATA_DIR, exist_ok=True)
 
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    id INTEGER PRIMARY KEY,
+    first_name TEXT NOT NULL DEFAULT '',
+    last_name TEXT NOT NULL DEFAULT '',
+    username TEXT NOT NULL DEFAULT '',
+    registered_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS users_registered_at ON users (registered_at);
+
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO meta (key, value) VALUES
+    ('user_count', 0), ('username_count', 0), ('json_migrated', 0);
+
+CREATE TRIGGER IF NOT EXISTS users_after_insert AFTER INSERT ON users
+BEGIN
+    UPDATE meta SET value = value + 1 WHERE key = 'user_count';
+    UPDATE meta SET value = value + 1 WHERE key = 'username_count' AND NEW.username != '';
+END;
+
+CREATE TRIGGER IF NOT EXISTS users_after_delete AFTER DELETE ON users
+BEGIN
+    UPDATE meta SET value = value - 1 WHERE key = 'user_count';
+    UPDATE meta SET value = value - 1 WHERE key = 'username_count' AND OLD.username != '';
+END;
+
+CREATE TRIGGER IF NOT EXISTS users_after_username_update AFTER UPDATE OF username ON users
+BEGIN
+    UPDATE meta SET value = value + (NEW.username != '') - (OLD.username != '')
+    WHERE key = 'username_count';
+END;
+"""
+
+_conn = None
+_lock = threading.RLock()
+
+def _connect():
+    global _conn
+    if _conn is None:
+        conn = sqlite3.connect(USERS_DB, check_same_thread=False, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript(SCHEMA)
+        _migrate_json(conn)
+        _conn = conn
+    return _conn
+
+def _get_meta(conn, key):
+    row = conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+    return row[0] if row else 0
+
+def _upsert_users(conn, users):
+    conn.executemany(
+        "INSERT INTO users (id, first_name, last_name, username, registered_at) "
+        "VALUES (?, ?, ?, ?, ?) "
+        "ON CONFLICT (id) DO UPDATE SET first_name = excluded.first_name, "
+        "last_name = excluded.last_name, username = excluded.username, "
+        "registered_at = excluded.registered_at",
+        (
+            (
+                int(user_id),
+                data.get("first_name") or "",
+                data.get("last_name") or "",
+                data.get("username") or "",
+                data.get("registered_at") or datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            )
+            for user_id, data in users.items()
+        )
+    )
+
+def _migrate_json(conn):
+    # One-shot import of the legacy users.json; the file is left untouched.
+    if _get_meta(conn, "json_migrated") or not os.path.exists(USERS_FILE):
+        return
+    try:
+        with open(USERS_FILE, 'r', encoding='utf-8') as f:
+            users = json.load(f)
+    except (json.JSONDecodeError, FileNotFoundError):
+        users = {}
+    
+    with conn:
+        conn.execute("BEGIN")
+        _upsert_users(conn, users)
+        conn.execute("UPDATE meta SET value = 1 WHERE key = 'json_migrated'")
+
+def _row_to_dict(row):
+    return {
+        "id": row["id"],
+        "first_name": row["first_name"],
+        "last_name": row["last_name"],
+        "username": row["username"],
+        "registered_at": row["registered_at"]
+    }
+
 def load_users():
-    if os.path.exists(USERS_FILE):
-        try:
-            with open(USERS_FILE, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        except (json.JSONDecodeError, FileNotFoundError):
-            return {}
-    return {}
+    with _lock:
+        rows = _connect().execute("SELECT * FROM users ORDER BY registered_at").fetchall()
+    return {str(row["id"]): _row_to_dict(row) for row in rows}
 
 def save_users(users):
-    with open(USERS_FILE, 'w', encoding='utf-8') as f:
-        json.dump(users, f, indent=2, ensure_ascii=False)
+    with _lock:
+        conn = _connect()
+        with conn:
+            conn.execute("BEGIN")
+            _upsert_users(conn, users)
 
 def is_new_user(user_id):
-    users = load_users()
-    return str(user_id) not in users
+    with _lock:
+        row = _connect().execute("SELECT 1 FROM users WHERE id = ?", (int(user_id),)).fetchone()
+    return row is None
 
 def register_user(user):
-    users = load_users()
-    user_id = str(user.id)
-    
-    if user_id in users:
-        return False, len(users)
-    
-    users[user_id] = {
-        "id": user.id,
-        "first_name": user.first_name or "",
-        "last_name": user.last_name or "",
-        "username": user.username or "",
-        "registered_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    }
-    
-    save_users(users)
-    return True, len(users)
+    with _lock:
+        conn = _connect()
+        cursor = conn.execute(
+            "INSERT OR IGNORE INTO users (id, first_name, last_name, username, registered_at) "
+            "VALUES (?, ?, ?, ?, ?)",
+            (
+                user.id,
+                user.first_name or "",
+                user.last_name or "",
+                user.username or "",
+                datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            )
+        )
+        return cursor.rowcount == 1, _get_meta(conn, "user_count")
 
 def get_total_users():
-    users = load_users()
-    return len(users)
+    with _lock:
+        return _get_meta(_connect(), "user_count")
+
+def get_username_count():
+    with _lock:
+        return _get_meta(_connect(), "username_count")
+
+def get_recent_users(limit=20):
+    with _lock:
+        rows = _connect().execute(
+            "SELECT * FROM users ORDER BY registered_at DESC, id DESC LIMIT ?", (limit,)
+        ).fetchall()
+    return [_row_to_dict(row) for row in rows]
+
+def iter_user_ids(after_id=None, batch_size=1000):
+    last_id = after_id if after_id is not None else -1
+    while True:
+        with _lock:
+            rows = _connect().execute(
+                "SELECT id FROM users WHERE id > ? ORDER BY id LIMIT ?", (last_id, batch_size)
+            ).fetchall()
+        if not rows:
+            return
+        for row in rows:
+            yield row[0]
+        last_id = rows[-1][0]
 
 def get_user_info_text(user, total_users):
     full_name = f"{user.first_name or ''} {user.last_name or ''}".strip()
@@ -0,0 +1,91 @@
+import asyncio
+import threading
+from config import EXTRACT_WORKERS, EXTRACT_QUEUE_SIZE, STREAM_BUFFER_ENTRIES
+
+_slots = None
+_waiting = 0
+_DONE = object()
+
+class PoolBusyError(Exception):
+    pass
+
+async def _acquire_slot():
+    global _slots, _waiting
+    if _slots is None:
+        _slots = asyncio.Semaphore(EXTRACT_WORKERS)
+
+    # Backpressure: callers wait for a free worker, but only up to
+    # EXTRACT_QUEUE_SIZE of them may wait at once.
+    if _slots.locked() and _waiting >= EXTRACT_QUEUE_SIZE:
+        raise PoolBusyError("The bot is busy right now, please try again in a minute")
+
+    _waiting += 1
+    try:
+        await _slots.acquire()
+    finally:
+        _waiting -= 1
+
+async def iterate_blocking(gen_func, *args, buffer_size=STREAM_BUFFER_ENTRIES):
+    await _acquire_slot()
+
+    loop = asyncio.get_running_loop()
+    queue = asyncio.Queue()
+    # One credit per item the producer may have ready but not yet consumed.
+    credits = threading.Semaphore(buffer_size)
+    stop = threading.Event()
+    # Whether this job holds a worker slot. The producer gives it up while
+    # the buffer is full, so a job waiting on slow uploads does not keep
+    # other archives from being extracted.
+    holding = [True]
+    finished = loop.create_future()
+
+    def produce():
+        error = None
+        iterator = gen_func(*args)
+        try:
+            while True:
+                if not credits.acquire(blocking=False):
+                    holding[0] = False
+                    loop.call_soon_threadsafe(_slots.release)
+                    credits.acquire()
+                    if stop.is_set():
+                        break
+                    asyncio.run_coroutine_threadsafe(_slots.acquire(), loop).result()
+                    holding[0] = True
+                if stop.is_set():
+                    break
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    break
+                loop.call_soon_threadsafe(queue.put_nowait, (item, None))
+        except Exception as e:
+            error = e
+        finally:
+            iterator.close()
+            loop.call_soon_threadsafe(queue.put_nowait, (_DONE, error))
+            loop.call_soon_threadsafe(lambda: finished.done() or finished.set_result(None))
+
+    # Producers run on their own threads: a parked producer must not take a
+    # thread from the archives that are being extracted in its slot.
+    threading.Thread(target=produce, name="extract", daemon=True).start()
+    try:
+        while True:
+            item, error = await queue.get()
+            if item is _DONE:
+                if error is not None:
+                    raise error
+                break
+            yield item
+            credits.release()
+    finally:
+        stop.set()
+        credits.release()
+        try:
+            await finished
+        finally:
+            if holding[0]:
+                _slots.release()
+
+def queue_depth():
+    return _waiting
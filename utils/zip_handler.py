@@ -1,86 +1,536 @@
+import io
+import multiprocessing
 import os
+import tarfile
+import threading
 import zipfile
-import shutil
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
-from config import EXTRACTED_DIR, VIDEO_EXTENSIONS, IMAGE_EXTENSIONS
+from config import (
+    EXTRACTED_DIR, VIDEO_EXTENSIONS, IMAGE_EXTENSIONS,
+    PARALLEL_EXTRACT_WORKERS, PARALLEL_EXTRACT_MIN_MB,
+    NESTED_EXTRACT_DEPTH, NESTED_IN_MEMORY_MAX_MB, SPLIT_LARGE_FILES, SPLIT_PART_MB
+)
+from utils.archive_backends import (
+    ARCHIVE_ERRORS, SINGLE_FILE_OPENERS, get_archive_format, iter_stream_members, iter_zip_members,
+    open_zip, open_zip_member
+)
 
 MAX_FILES = 100
 MAX_TOTAL_SIZE = 100 * 1024 * 1024
 MAX_SINGLE_FILE_SIZE = 50 * 1024 * 1024
 
-def check_zip_safety(file_path):
-    try:
-        total_size = 0
-        file_count = 0
-        
-        with zipfile.ZipFile(file_path, 'r') as zip_ref:
-            for file_info in zip_ref.infolist():
-                if file_info.is_dir():
-                    continue
-                
-                file_count += 1
-                total_size += file_info.file_size
-                
-                if file_count > MAX_FILES:
-                    return False, f"Too many files in archive (max: {MAX_FILES})"
-                
-                if file_info.file_size > MAX_SINGLE_FILE_SIZE:
-                    return False, f"File too large: {file_info.filename} (max: 50MB per file)"
-                
-                if total_size > MAX_TOTAL_SIZE:
-                    return False, f"Total uncompressed size too large (max: 100MB)"
+MAX_COMPRESSION_RATIO = 200
+RATIO_CHECK_MIN_SIZE = 1024 * 1024
+COPY_CHUNK_SIZE = 1024 * 1024
+PARALLEL_CHUNKS_PER_WORKER = 4
+
+# Deflating these again costs CPU and saves next to nothing.
+STORED_EXTENSIONS = set(VIDEO_EXTENSIONS + IMAGE_EXTENSIONS + [
+    '.zip', '.gz', '.tgz', '.bz2', '.tbz2', '.xz', '.txz', '.7z', '.rar',
+    '.mp3', '.ogg', '.m4a', '.pdf', '.docx', '.xlsx', '.pptx', '.apk', '.jar'
+]) - {'.bmp', '.tiff', '.svg'}
+
+_process_pool = None
+_process_pool_lock = threading.Lock()
+
+class ExtractionError(Exception):
+    pass
+
+# One budget is shared by an archive and every archive nested inside it, so
+# nesting cannot multiply the file count or decompressed size limits. It also
+# carries the job's memory allowance (see SpillFile), if any, and the
+# callback told the archive's totals for progress reporting.
+class ExtractionBudget:
+    def __init__(self, memory=None, on_totals=None):
+        self.files_left = MAX_FILES
+        self.bytes_left = MAX_TOTAL_SIZE
+        self.memory = memory
+        self.on_totals = on_totals
+
+    def take_file(self):
+        if self.files_left <= 0:
+            raise ExtractionError(f"Too many files in archive (max: {MAX_FILES})")
+        self.files_left -= 1
+
+    @property
+    def file_index(self):
+        return MAX_FILES - self.files_left - 1
+
+    def entry_limit(self, member_name):
+        return get_entry_limit(member_name, MAX_TOTAL_SIZE - self.bytes_left)
+
+    def add_bytes(self, size):
+        self.bytes_left -= size
+        if self.bytes_left < 0:
+            raise ExtractionError("Total uncompressed size too large (max: 100MB)")
+
+def validate_zip_entries(zip_ref, budget=None):
+    budget = budget or ExtractionBudget()
+    total_size = 0
+    file_count = 0
+    
+    for file_info in zip_ref.infolist():
+        if file_info.is_dir():
+            continue
+        
+        file_count += 1
+        total_size += file_info.file_size
+        
+        if file_count > budget.files_left:
+            raise ExtractionError(f"Too many files in archive (max: {MAX_FILES})")
+        
+        if file_info.file_size > get_max_file_size():
+            raise ExtractionError(f"File too large: {file_info.filename} (max: 50MB per file)")
+        
+        if total_size > budget.bytes_left:
+            raise ExtractionError(f"Total uncompressed size too large (max: 100MB)")
         
+        if (file_info.file_size > RATIO_CHECK_MIN_SIZE
+                and file_info.file_size > file_info.compress_size * MAX_COMPRESSION_RATIO):
+            raise ExtractionError(f"Suspicious compression ratio: {file_info.filename}")
+    
+    return file_count, total_size
+
+def check_zip_safety(file_path, archive_name=None):
+    archive_format = get_archive_format(archive_name or file_path) or "zip"
+    try:
+        if archive_format == "tar":
+            # Streaming formats are limit-checked during extraction; here we
+            # only make sure the archive can be opened.
+            with tarfile.open(file_path, mode="r|*"):
+                pass
+        elif archive_format != "zip":
+            with SINGLE_FILE_OPENERS[archive_format](file_path, 'rb') as source:
+                source.read(1)
+        else:
+            with open_zip(file_path) as zip_ref:
+                validate_zip_entries(zip_ref)
         return True, None
-    except zipfile.BadZipFile:
-        return False, "Invalid or corrupted ZIP file"
+    except ExtractionError as e:
+        return False, str(e)
+    except ARCHIVE_ERRORS as e:
+        if isinstance(e, OSError) and e.errno:
+            return False, str(e)
+        return False, f"Invalid or corrupted {archive_format.upper()} archive"
     except Exception as e:
         return False, str(e)
 
-def extract_zip(file_path, user_id):
-    is_safe, error = check_zip_safety(file_path)
-    if not is_safe:
-        return {"success": False, "error": error}
+def get_extract_dir(user_id):
+    return os.path.join(EXTRACTED_DIR, str(user_id), datetime.now().strftime("%Y%m%d_%H%M%S_%f"))
+
+def get_file_type(file_name):
+    ext_lower = os.path.splitext(file_name)[1].lower()
+    if ext_lower in VIDEO_EXTENSIONS:
+        return "video"
+    if ext_lower in IMAGE_EXTENSIONS:
+        return "image"
+    return "file"
+
+class UniqueNamer:
+    # Resolves name collisions from memory instead of probing the disk; the
+    # per-name counter keeps thousands of identical names linear.
+    def __init__(self):
+        self.used = set()
+        self.next_suffix = {}
+
+    def claim(self, name):
+        if name not in self.used:
+            self.used.add(name)
+            return name
+        base_name, ext = os.path.splitext(name)
+        counter = self.next_suffix.get(name, 1)
+        candidate = f"{base_name}_{counter}{ext}"
+        while candidate in self.used:
+            counter += 1
+            candidate = f"{base_name}_{counter}{ext}"
+        self.next_suffix[name] = counter + 1
+        self.used.add(candidate)
+        return candidate
+
+def get_safe_name(file_name, fallback_index):
+    safe_name = "".join(c for c in file_name if c.isalnum() or c in "._- ")
+    return safe_name or f"file_{fallback_index}"
+
+def copy_limited(source, target, max_bytes, error_message):
+    # Counts what is actually decompressed so a lying size header cannot
+    # get past the limits checked against the central directory. Stored
+    # members of mapped archives hand out views instead of copies.
+    read = getattr(source, "read_view", source.read)
+    written = 0
+    while True:
+        chunk = read(COPY_CHUNK_SIZE)
+        if not chunk:
+            return written
+        written += len(chunk)
+        if written > max_bytes:
+            raise ExtractionError(error_message)
+        target.write(chunk)
+
+def get_max_file_size():
+    # Files split into parts only have to fit in the total size limit.
+    return MAX_TOTAL_SIZE if SPLIT_LARGE_FILES else MAX_SINGLE_FILE_SIZE
+
+def get_split_part_size():
+    return SPLIT_PART_MB * 1024 * 1024 if SPLIT_LARGE_FILES else None
+
+def needs_split(member_size):
+    # Decided from the header before inflating; an unknown size (single-file
+    # gz/bz2/xz) is split on the fly and kept whole if it fits in one part.
+    part_size = get_split_part_size()
+    return part_size is not None and (member_size is None or member_size > part_size)
+
+def get_entry_limit(member_name, total_written):
+    remaining = MAX_TOTAL_SIZE - total_written
+    if remaining < get_max_file_size():
+        return remaining, "Total uncompressed size too large (max: 100MB)"
+    return get_max_file_size(), f"File too large: {member_name} (max: 50MB per file)"
+
+def make_entry(target_path, size):
+    name = os.path.basename(target_path)
+    return {
+        "path": target_path,
+        "name": name,
+        "size": size,
+        "type": get_file_type(name)
+    }
+
+# Write target for one entry. While the job's memory allowance lasts the
+# entry stays in memory and is uploaded from there; past it, everything is
+# moved to target_path and the rest goes to disk. Without an allowance it is
+# a plain file.
+class SpillFile:
+    def __init__(self, target_path, memory=None):
+        self.target_path = target_path
+        self.memory = memory
+        self.buffer = io.BytesIO() if memory else None
+        self.file = None if memory else open(target_path, 'wb')
+        self.reserved = 0
+
+    def write(self, data):
+        if self.file is None:
+            if self.memory.reserve(len(data)):
+                self.reserved += len(data)
+                return self.buffer.write(data)
+            self.file = open(self.target_path, 'wb')
+            self.file.write(self.buffer.getbuffer())
+            self.buffer = None
+            self.memory.release(self.reserved)
+            self.reserved = 0
+        return self.file.write(data)
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        if exc_type is not None:
+            # A partly written entry is never delivered.
+            if self.reserved:
+                self.memory.release(self.reserved)
+                self.reserved = 0
+            if self.file is not None and os.path.exists(self.target_path):
+                os.remove(self.target_path)
+        return False
+
+    def make_entry(self, size):
+        entry = make_entry(self.target_path, size)
+        if self.file is None:
+            entry["path"] = None
+            entry["data"] = self.buffer.getvalue()
+            self.buffer = None
+        return entry
+
+def iter_planned_entries(zip_ref, extract_dir):
+    namer = UniqueNamer()
+    count = 0
+    for index, file_info in enumerate(zip_ref.infolist()):
+        if file_info.is_dir():
+            continue
+        
+        file_name = os.path.basename(file_info.filename)
+        if not file_name:
+            continue
+        
+        safe_name = namer.claim(get_safe_name(file_name, count))
+        count += 1
+        yield index, file_info, os.path.join(extract_dir, safe_name)
+
+def get_process_pool():
+    # Created from extraction threads, so the lock keeps it to one pool. The
+    # bot is multi-threaded and holds sockets and SQLite connections, so
+    # workers start from a clean forkserver (spawn where unavailable) instead
+    # of a fork of this process.
+    global _process_pool
+    with _process_pool_lock:
+        if _process_pool is None:
+            method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+            _process_pool = ProcessPoolExecutor(
+                max_workers=PARALLEL_EXTRACT_WORKERS, mp_context=multiprocessing.get_context(method)
+            )
+    return _process_pool
+
+def extract_members(file_path, members):
+    # Runs in a worker process with its own ZipFile handle.
+    sizes = []
+    with open_zip(file_path) as zip_ref:
+        file_infos = zip_ref.infolist()
+        for index, target_path in members:
+            file_info = file_infos[index]
+            limit, error = get_entry_limit(file_info.filename, 0)
+            with open_zip_member(zip_ref, file_info) as source:
+                with open(target_path, 'wb') as target:
+                    sizes.append(copy_limited(source, target, limit, error))
+    return sizes
+
+def iter_chunks(planned, chunk_bytes):
+    chunk = []
+    size = 0
+    for index, file_info, target_path in planned:
+        chunk.append((index, target_path))
+        size += file_info.file_size
+        if size >= chunk_bytes:
+            yield chunk
+            chunk = []
+            size = 0
+    if chunk:
+        yield chunk
+
+def iter_extract_parallel(file_path, zip_ref, extract_dir, total_size, budget):
+    # Entries are split into consecutive chunks that worker processes inflate
+    # concurrently; chunks are collected in order so results stay in archive
+    # order, and only a few chunks run ahead of the consumer.
+    pool = get_process_pool()
+    chunk_bytes = max(total_size // (PARALLEL_EXTRACT_WORKERS * PARALLEL_CHUNKS_PER_WORKER), 1)
+    pending = deque()
+    
+    def collect():
+        chunk, future = pending.popleft()
+        for (_, target_path), size in zip(chunk, future.result()):
+            budget.take_file()
+            budget.add_bytes(size)
+            yield make_entry(target_path, size)
+    
+    try:
+        for chunk in iter_chunks(iter_planned_entries(zip_ref, extract_dir), chunk_bytes):
+            pending.append((chunk, pool.submit(extract_members, file_path, chunk)))
+            if len(pending) > PARALLEL_EXTRACT_WORKERS:
+                yield from collect()
+        while pending:
+            yield from collect()
+    finally:
+        for _, future in pending:
+            future.cancel()
+
+def iter_extract_members(members, extract_dir, archive_size, budget, namer, depth):
+    # Sequential extraction for any backend. Count, size and ratio limits
+    # are enforced while streaming because tarballs and single-file
+    # compressors have no central directory to check up front.
+    written_here = 0
+    
+    for member_name, member_size, source in members:
+        file_name = os.path.basename(member_name)
+        if not file_name:
+            continue
+        
+        budget.take_file()
+        
+        nested_format = get_archive_format(file_name) if depth < NESTED_EXTRACT_DEPTH else None
+        if nested_format:
+            yield from iter_extract_nested(
+                source, file_name, member_size, nested_format, extract_dir, budget, namer, depth + 1
+            )
+            continue
+        
+        target_name = namer.claim(get_safe_name(file_name, budget.file_index))
+        limit, error = budget.entry_limit(member_name)
+        if needs_split(member_size):
+            entries = iter_write_parts(source, target_name, extract_dir, namer, member_size, limit, error)
+        else:
+            with SpillFile(os.path.join(extract_dir, target_name), budget.memory) as target:
+                written = copy_limited(source, target, limit, error)
+            entries = [target.make_entry(written)]
+        
+        for entry in entries:
+            budget.add_bytes(entry["size"])
+            written_here += entry["size"]
+            if (archive_size and written_here > RATIO_CHECK_MIN_SIZE
+                    and written_here > archive_size * MAX_COMPRESSION_RATIO):
+                raise ExtractionError("Suspicious compression ratio")
+            yield entry
+
+def iter_write_parts(source, target_name, extract_dir, namer, member_size, max_bytes, error_message):
+    # Streams one member into numbered parts below the upload cap, yielding
+    # each part as soon as it is complete so it can be sent while the next
+    # one inflates. Never holds more than one copy chunk in memory.
+    part_size = get_split_part_size()
+    parts = -(-member_size // part_size) if member_size is not None else None
+    read = getattr(source, "read_view", source.read)
+    written = 0
+    index = 0
+    pending = read(COPY_CHUNK_SIZE)
+    
+    while pending:
+        if written >= max_bytes:
+            raise ExtractionError(error_message)
+        index += 1
+        part_path = os.path.join(extract_dir, namer.claim(f"{target_name}.{index:03d}"))
+        part_written = 0
+        part_limit = min(part_size, max_bytes - written)
+        try:
+            with open(part_path, 'wb') as target:
+                while pending and part_written < part_limit:
+                    chunk = pending[:part_limit - part_written]
+                    pending = pending[len(chunk):]
+                    target.write(chunk)
+                    part_written += len(chunk)
+                    if not pending:
+                        pending = read(COPY_CHUNK_SIZE)
+        except Exception:
+            os.remove(part_path)
+            raise
+        written += part_written
+        
+        if index == 1 and not pending:
+            # Turned out to fit in a single part: deliver it under its own name.
+            target_path = os.path.join(extract_dir, target_name)
+            os.replace(part_path, target_path)
+            yield make_entry(target_path, part_written)
+            return
+        
+        entry = make_entry(part_path, part_written)
+        entry.update({"split_from": target_name, "part": index, "parts": parts})
+        yield entry
+
+def iter_extract_nested(source, file_name, size, archive_format, extract_dir, budget, namer, depth):
+    # The inner archive is copied out first (small ones to memory, larger ones
+    # to a temporary file) and unpacked on trial. If it cannot be parsed or
+    # its contents do not fit the remaining budget, whatever it produced is
+    # discarded and the archive is delivered as a plain file instead.
+    limit, error = budget.entry_limit(file_name)
     
-    user_extract_dir = os.path.join(EXTRACTED_DIR, str(user_id), datetime.now().strftime("%Y%m%d_%H%M%S"))
-    os.makedirs(user_extract_dir, exist_ok=True)
+    if size is not None and size <= NESTED_IN_MEMORY_MAX_MB * 1024 * 1024:
+        buffer = io.BytesIO()
+        copy_limited(source, buffer, limit, error)
+        yield from iter_extract_buffered(buffer, file_name, archive_format, extract_dir, budget, namer, depth)
+        return
+    
+    spool_path = os.path.join(extract_dir, f".nested_{budget.files_left}_{depth}")
+    try:
+        with open(spool_path, 'w+b') as spool:
+            copy_limited(source, spool, limit, error)
+            yield from iter_extract_buffered(spool, file_name, archive_format, extract_dir, budget, namer, depth)
+    finally:
+        if os.path.exists(spool_path):
+            os.remove(spool_path)
+
+def discard_entries(entries, budget):
+    for entry in entries:
+        if entry["path"]:
+            if os.path.exists(entry["path"]):
+                os.remove(entry["path"])
+        elif budget.memory:
+            budget.memory.release(entry["size"])
+
+def iter_extract_buffered(buffer, file_name, archive_format, extract_dir, budget, namer, depth):
+    buffer.seek(0)
+    files_left, bytes_left = budget.files_left, budget.bytes_left
+    entries = []
+    try:
+        for entry in iter_extract_source(buffer, archive_format, file_name, extract_dir, budget, namer, depth):
+            entries.append(entry)
+    except (ExtractionError,) + ARCHIVE_ERRORS as e:
+        if isinstance(e, OSError) and e.errno:
+            discard_entries(entries, budget)
+            raise
+        discard_entries(entries, budget)
+        budget.files_left, budget.bytes_left = files_left, bytes_left
+    else:
+        yield from entries
+        return
+    
+    buffer.seek(0)
+    target_path = os.path.join(extract_dir, namer.claim(get_safe_name(file_name, budget.file_index)))
+    limit, error = budget.entry_limit(file_name)
+    with SpillFile(target_path, budget.memory) as target:
+        written = copy_limited(buffer, target, limit, error)
+    budget.add_bytes(written)
+    yield target.make_entry(written)
+
+def iter_extract_source(source, archive_format, archive_name, extract_dir, budget, namer, depth):
+    if isinstance(source, str):
+        archive_size = os.path.getsize(source)
+    elif isinstance(source, io.BytesIO):
+        archive_size = source.getbuffer().nbytes
+    else:
+        archive_size = None
+    
+    if archive_format != "zip":
+        members = iter_stream_members(source, archive_format, archive_name)
+        yield from iter_extract_members(members, extract_dir, archive_size, budget, namer, depth)
+        return
+    
+    with open_zip(source) as zip_ref:
+        file_count, total_size = validate_zip_entries(zip_ref, budget)
+        
+        has_nested = depth < NESTED_EXTRACT_DEPTH and any(
+            get_archive_format(file_info.filename) for file_info in zip_ref.infolist()
+        )
+        has_split = any(needs_split(file_info.file_size) for file_info in zip_ref.infolist())
+        # Only a ZIP has its totals up front, and nested archives would
+        # add entries the outer index does not count.
+        if depth == 0 and not has_nested and budget.on_totals:
+            budget.on_totals(file_count, total_size)
+        # Worker processes reopen the archive by path, so in-memory
+        # downloads are always extracted here.
+        if (depth == 0 and isinstance(source, str) and not has_nested and not has_split
+                and PARALLEL_EXTRACT_WORKERS > 1 and file_count > 1
+                and total_size >= PARALLEL_EXTRACT_MIN_MB * 1024 * 1024):
+            yield from iter_extract_parallel(source, zip_ref, extract_dir, total_size, budget)
+            return
+        
+        yield from iter_extract_members(
+            iter_zip_members(zip_ref), extract_dir, archive_size, budget, namer, depth
+        )
+
+def iter_extract_zip(source, extract_dir, archive_name=None, memory=None, on_totals=None):
+    # source is a path or an in-memory buffer holding the archive. With a
+    # memory allowance, entries that fit are yielded with "data" instead of
+    # a "path" on disk. on_totals(files, bytes) is called from the extracting
+    # thread once a ZIP's index has been validated.
+    archive_name = archive_name or source
+    archive_format = get_archive_format(archive_name) or "zip"
+    
+    try:
+        os.makedirs(extract_dir, exist_ok=True)
+        yield from iter_extract_source(
+            source, archive_format, archive_name, extract_dir,
+            ExtractionBudget(memory, on_totals), UniqueNamer(), 0
+        )
+    except ARCHIVE_ERRORS as e:
+        if isinstance(e, OSError) and e.errno:
+            raise
+        raise ExtractionError(f"Invalid or corrupted {archive_format.upper()} archive")
+
+def extract_zip(file_path, user_id, archive_name=None):
+    user_extract_dir = get_extract_dir(user_id)
     
     extracted_files = []
     video_files = []
     image_files = []
     
     try:
-        with zipfile.ZipFile(file_path, 'r') as zip_ref:
-            for file_info in zip_ref.infolist():
-                if file_info.is_dir():
-                    continue
-                    
-                file_name = os.path.basename(file_info.filename)
-                if not file_name:
-                    continue
-                
-                safe_name = "".join(c for c in file_name if c.isalnum() or c in "._- ")
-                if not safe_name:
-                    safe_name = f"file_{len(extracted_files)}"
-                
-                target_path = os.path.join(user_extract_dir, safe_name)
-                
-                counter = 1
-                base_name, ext = os.path.splitext(safe_name)
-                while os.path.exists(target_path):
-                    target_path = os.path.join(user_extract_dir, f"{base_name}_{counter}{ext}")
-                    counter += 1
-                
-                with zip_ref.open(file_info) as source:
-                    with open(target_path, 'wb') as target:
-                        shutil.copyfileobj(source, target)
-                
-                extracted_files.append(target_path)
-                
-                ext_lower = os.path.splitext(safe_name)[1].lower()
-                if ext_lower in VIDEO_EXTENSIONS:
-                    video_files.append(target_path)
-                elif ext_lower in IMAGE_EXTENSIONS:
-                    image_files.append(target_path)
+        for entry in iter_extract_zip(file_path, user_extract_dir, archive_name):
+            extracted_files.append(entry["path"])
+            if entry["type"] == "video":
+                video_files.append(entry["path"])
+            elif entry["type"] == "image":
+                image_files.append(entry["path"])
         
         return {
             "success": True,
@@ -91,36 +541,10 @@ def extract_zip(file_path, user_id):
             "image_files": image_files
         }
         
-    except zipfile.BadZipFile:
-        return {"success": False, "error": "Invalid or corrupted ZIP file"}
     except Exception as e:
         return {"success": False, "error": str(e)}
 
-def create_backup_zip(items, output_path, base_dir=None):
-    try:
-        with zipfile.ZipFile(output_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
-            for item in items:
-                if not os.path.exists(item):
-                    continue
-                
-                if os.path.isfile(item):
-                    if base_dir:
-                        arcname = os.path.relpath(item, base_dir)
-                    else:
-                        arcname = os.path.basename(item)
-                    zipf.write(item, arcname)
-                elif os.path.isdir(item):
-                    for root, dirs, files in os.walk(item):
-                        dirs[:] = [d for d in dirs if d != '__pycache__' and not d.startswith('.')]
-                        for file in files:
-                            if file.endswith('.pyc') or file.startswith('.'):
-                                continue
-                            file_path = os.path.join(root, file)
-                            if base_dir:
-                                arcname = os.path.relpath(file_path, base_dir)
-                            else:
-                                arcname = os.path.relpath(file_path, os.path.dirname(item))
-                            zipf.write(file_path, arcname)
-        return True, output_path
-    except Exception as e:
-        return False, str(e)
+def get_compress_type(file_name):
+    if os.path.splitext(file_name)[1].lower() in STORED_EXTENSIONS:
+        return zipfile.ZIP_STORED
+    return zipfile.ZIP_DEFLATED